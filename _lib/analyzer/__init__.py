@@ -1,5 +1,9 @@
 from .core import BaseAnalyzer, analyzer_property, group
 from . import field
+from . import envelope
+from . import jit
+
+import importlib
 
 
 __all__ = [
@@ -7,4 +11,16 @@ __all__ = [
     'analyzer_property',
     'group',
     'field',
+    'envelope',
+    'filterbank',
+    'jit',
 ]
+
+
+def __getattr__(name: str):
+    # filterbank (scipy) is imported when an analyzer uses it
+    if name == 'filterbank':
+        return importlib.import_module('.filterbank', __name__)
+    raise AttributeError(
+        'module {!r} has no attribute {!r}'.format(__name__, name)
+    )
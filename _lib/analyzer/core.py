@@ -98,9 +98,52 @@ class AnalyzerMeta (type):
 
 
 class BaseAnalyzer (metaclass=AnalyzerMeta):
+    # the floating point precision of all analyzers (set by the application)
+    default_dtype: np.dtype = np.dtype(np.float32)
+    # the precision of this analyzer (None means `default_dtype`);
+    # the signal, the buffer and the floating point results are kept in it
+    precision: Optional[np.dtype] = None
+    # the elements of the result arrays are resent to the client
+    # only when they change by more than this threshold
+    delta_threshold: float = 0.0
+    # the number of quality levels the analyzer supports;
+    # `quality` is set by the framework (0 is the full quality
+    # and the larger levels are cheaper) when it is overloaded
+    quality_levels: int = 1
+    quality: int = 0
+    # analyze only every `decimation`-th frame when it is overloaded
+    # (then `frame_step * decimation` samples arrive between the frames)
+    decimation: int = 1
+    # receive signals of the shape (channels, window_size)
+    # instead of (window_size, channels)
+    channel_major: bool = False
+    # the channels can be analyzed separately; then the frames may be split
+    # into groups of channels analyzed in parallel, and the results of the
+    # groups are reassembled by concatenating the `channel_results`
+    # (lists or arrays with a channel per element) and taking the other
+    # results from the first group
+    channel_independent: bool = False
+    channel_results: Tuple[str, ...] = ()
+
+    @classmethod
+    def resolve_dtype(cls) -> np.dtype:
+        if cls.precision is None:
+            return np.dtype(cls.default_dtype)
+        return np.dtype(cls.precision)
+
+    @property
+    def dtype(self) -> np.dtype:
+        return type(self).resolve_dtype()
+
     def analyze(self, signal: np.ndarray):
         raise NotImplementedError
 
+    def reset(self):
+        """Called when the input signal is discontinuous
+        (the samples were dropped to catch up) before the next frame.
+        """
+        pass
+
     def get_client_properties(
         self,
         client_names: Optional[Iterable[str]] = None,
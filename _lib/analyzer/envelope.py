@@ -0,0 +1,49 @@
+import numpy as np
+
+
+class MinMaxEnvelope:
+    """Per-pixel minimum and maximum of the latest `window_size` samples.
+
+    The samples are reduced by `samples_per_pixel` along the first axis,
+    and `update` reduces only the newly arrived samples and scrolls
+    the envelope by the number of completed pixels.
+    A pixel that is not completed yet is kept until the next update.
+    """
+    def __init__(self, window_size: int, width: int):
+        width = max(1, width)
+        self.samples_per_pixel = max(1, -(-window_size // width))
+        self.n_pixels = max(1, window_size // self.samples_per_pixel)
+        self.minimum: np.ndarray = None
+        self.maximum: np.ndarray = None
+        self._rest: np.ndarray = None
+
+    def reset(self, signal: np.ndarray):
+        shape = (self.n_pixels,) + signal.shape[1:]
+        self.minimum = np.zeros(shape, dtype=signal.dtype)
+        self.maximum = np.zeros(shape, dtype=signal.dtype)
+        self._rest = signal[:0]
+        self.update(signal)
+
+    def update(self, samples: np.ndarray):
+        if self._rest is None:
+            self.reset(samples)
+            return
+
+        samples = np.concatenate([self._rest, samples])
+        n_completed = samples.shape[0] // self.samples_per_pixel
+        used_length = n_completed * self.samples_per_pixel
+        self._rest = samples[used_length:].copy()
+        if n_completed == 0:
+            return
+
+        blocks = samples[:used_length].reshape(
+            (n_completed, self.samples_per_pixel) + samples.shape[1:]
+        )
+        minimum = blocks.min(axis=1)
+        maximum = blocks.max(axis=1)
+
+        n = min(n_completed, self.n_pixels)
+        self.minimum[:self.n_pixels - n] = self.minimum[n:]
+        self.maximum[:self.n_pixels - n] = self.maximum[n:]
+        self.minimum[self.n_pixels - n:] = minimum[n_completed - n:]
+        self.maximum[self.n_pixels - n:] = maximum[n_completed - n:]
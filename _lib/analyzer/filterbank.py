@@ -0,0 +1,174 @@
+import numpy as np
+import scipy as sp
+import scipy.fft
+import scipy.signal
+import scipy.sparse
+
+from functools import lru_cache
+
+from typing import Optional, Union
+
+
+DTypeLike = Union[np.dtype, type]
+
+
+class FilterBank:
+    """Sparse matrix applied to the last axis of spectra.
+
+    The coefficients are kept in the precision of the analyzer (`dtype`,
+    or its complex counterpart) so that the spectra are not upcast.
+    """
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        frequencies: np.ndarray,
+        threshold: float = 0.0,
+        dtype: DTypeLike = np.float32,
+    ):
+        matrix = np.array(matrix)
+        if np.iscomplexobj(matrix):
+            matrix = matrix.astype(np.result_type(dtype, np.complex64))
+        else:
+            matrix = matrix.astype(dtype)
+        if 0.0 < threshold:
+            # drop the negligible coefficients row by row
+            peaks = np.abs(matrix).max(axis=1, keepdims=True)
+            matrix[np.abs(matrix) < threshold * peaks] = 0.0
+        self.matrix = sp.sparse.csr_matrix(matrix)
+        self.frequencies = frequencies
+
+    @property
+    def n_bins(self):
+        return self.matrix.shape[0]
+
+    def apply(self, spectra: np.ndarray):
+        """Apply the filters to spectra of the shape (..., n_frequencies).
+
+        All leading axes (e.g. frames and channels) are flattened
+        so that a block of frames is processed as a single matrix product.
+        """
+        shape = spectra.shape
+        flat = spectra.reshape(-1, shape[-1])
+        result = np.asarray(self.matrix.dot(flat.T)).T
+        return result.reshape(shape[:-1] + (self.n_bins,))
+
+
+def power_spectrum(signal: np.ndarray, window: np.ndarray):
+    """Windowed one-sided power spectrum.
+
+    The signal is channel-major of the shape (..., channels, window_size)
+    and the result has the shape (..., channels, n_frequencies).
+    """
+    signal = signal * window
+    # scipy.fft keeps single precision unlike numpy.fft
+    return np.abs(sp.fft.rfft(signal, axis=-1)) ** 2
+
+
+def complex_spectrum(signal: np.ndarray, window: Optional[np.ndarray] = None):
+    """One-sided complex spectrum of the shape (..., channels, n_frequencies)
+    of a channel-major signal of the shape (..., channels, window_size).
+    """
+    if window is not None:
+        signal = signal * window
+    return sp.fft.rfft(signal, axis=-1)
+
+
+@lru_cache(maxsize=32)
+def mel(
+    sample_rate: float,
+    window_size: int,
+    n_bins: int,
+    fmin: float = 0.0,
+    fmax: Optional[float] = None,
+    dtype: DTypeLike = np.float32,
+):
+    """Mel filterbank cached per configuration.
+    """
+    nyquist = sample_rate / 2.0
+    if fmax is None:
+        fmax = nyquist
+    if not 0.0 <= fmin < fmax <= nyquist:
+        raise ValueError(
+            'The mel bands require 0 <= fmin < fmax <= {} '
+            '(fmin {}, fmax {}).'.format(nyquist, fmin, fmax)
+        )
+
+    # librosa takes a long time to be imported
+    import librosa
+
+    matrix = librosa.filters.mel(
+        sr=sample_rate,
+        n_fft=window_size,
+        n_mels=n_bins,
+        fmin=fmin,
+        fmax=fmax,
+    )
+    # the centers of the triangular filters
+    # (the edges of the bands are spaced evenly on the mel scale)
+    frequencies = librosa.mel_frequencies(
+        n_mels=n_bins + 2,
+        fmin=fmin,
+        fmax=fmax,
+    )[1:-1]
+    return FilterBank(matrix, frequencies, dtype=dtype)
+
+
+@lru_cache(maxsize=32)
+def chroma(
+    sample_rate: float,
+    window_size: int,
+    n_bins: int = 12,
+    threshold: float = 0.01,
+    dtype: DTypeLike = np.float32,
+):
+    """Chroma filterbank cached per configuration.
+    """
+    # librosa takes a long time to be imported
+    import librosa
+
+    matrix = librosa.filters.chroma(
+        sr=sample_rate,
+        n_fft=window_size,
+        n_chroma=n_bins,
+    )
+    frequencies = np.arange(n_bins) * (12.0 / n_bins)
+    return FilterBank(matrix, frequencies, threshold, dtype)
+
+
+@lru_cache(maxsize=32)
+def cqt(
+    sample_rate: float,
+    window_size: int,
+    n_bins: int,
+    fmin: float,
+    bins_per_octave: int = 12,
+    threshold: float = 0.0054,
+    dtype: DTypeLike = np.float32,
+):
+    """Spectral kernel of the constant-Q transform cached per configuration.
+
+    The kernel is applied to the complex spectrum (not the power spectrum)
+    of an unwindowed frame; the power of the result is the CQT power.
+    """
+    q_factor = 1.0 / (2.0 ** (1.0 / bins_per_octave) - 1.0)
+    frequencies = fmin * 2.0 ** (np.arange(n_bins) / bins_per_octave)
+
+    kernel = np.zeros((n_bins, window_size), dtype=np.complex128)
+    for index, frequency in enumerate(frequencies):
+        if sample_rate / 2.0 <= frequency:
+            break
+        length = int(np.ceil(q_factor * sample_rate / frequency))
+        length = max(1, min(length, window_size))
+        start = (window_size - length) // 2
+        n = np.arange(length)
+        kernel[index, start:start + length] = (
+            sp.signal.get_window('hann', length, fftbins=False)
+            * np.exp(2j * np.pi * frequency * n / sample_rate)
+            / length
+        )
+
+    # Parseval: <x, k> = <X, K> / N
+    # (the kernels are analytic, so only the positive frequencies matter)
+    spectral_kernel = np.fft.fft(kernel, axis=1)[:, :window_size // 2 + 1]
+    matrix = np.conj(spectral_kernel) / window_size
+    return FilterBank(matrix, frequencies, threshold, dtype)
@@ -0,0 +1,188 @@
+import numpy as np
+
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import ModuleType
+
+from typing import Any, Optional, Callable, Dict, Tuple, List
+
+
+_numba = None
+_numba_loaded = False
+
+
+def load_numba():
+    """Import Numba on demand (None when it is not installed).
+
+    Numba takes a long time to be imported, so it is imported
+    when the first kernel is defined, not when the server starts.
+    """
+    global _numba, _numba_loaded
+    if not _numba_loaded:
+        try:
+            import numba
+            _numba = numba
+        except ImportError:
+            _numba = None
+        _numba_loaded = True
+    return _numba
+
+
+WarmupArgs = Callable[[int, int, np.dtype], Tuple[Any, ...]]
+
+
+def default_warmup_args(
+    window_size: int,
+    channels: int,
+    dtype: np.dtype,
+    channel_major: bool = True,
+):
+    """Arguments of the same shape as the signal passed to `analyze`,
+    `(channels, window_size)` unless the analyzer is not channel-major.
+    """
+    if channel_major:
+        return (np.zeros((channels, window_size), dtype=dtype),)
+    return (np.zeros((window_size, channels), dtype=dtype),)
+
+
+def is_available():
+    return load_numba() is not None
+
+
+class kernel:
+    """Numeric kernel compiled by Numba when it is installed.
+
+    Without Numba, the decorated function is called as plain Python.
+    The compiled code is cached on disk (`cache=True`) and the kernel is
+    compiled ahead of time by `warmup_module` with zero-filled arguments
+    made by `warmup` (one signal-shaped array by default).
+
+        @jit.kernel
+        def zero_crossings(signal): ...
+
+        @jit.kernel(warmup=lambda window_size, channels, dtype: (...))
+        def autocorrelation(signal, max_lag): ...
+    """
+    def __init__(
+        self,
+        function: Optional[Callable] = None,
+        *,
+        warmup: Optional[WarmupArgs] = None,
+        **options,
+    ):
+        self.warmup_args: Optional[WarmupArgs] = warmup
+        self.options = {'cache': True, 'nogil': True}
+        self.options.update(options)
+        self.function: Optional[Callable] = None
+        if function is not None:
+            self._wrap(function)
+
+    def _wrap(self, function: Callable):
+        self.python_function = function
+        numba = load_numba()
+        if numba is None:
+            self.function = function
+        else:
+            self.function = numba.njit(**self.options)(function)
+        functools.update_wrapper(self, function)
+
+    def __call__(self, *args, **kwargs):
+        if self.function is None:
+            # used as `@kernel(...)`
+            self._wrap(*args)
+            return self
+        return self.function(*args, **kwargs)
+
+    def warmup(
+        self,
+        window_size: int,
+        channels: int,
+        dtype: np.dtype = np.float32,
+        channel_major: bool = True,
+    ):
+        if self.function is None or self.function is self.python_function:
+            return
+        if self.warmup_args is None:
+            args = default_warmup_args(
+                window_size, channels, dtype, channel_major,
+            )
+        else:
+            args = self.warmup_args(window_size, channels, dtype)
+        self.function(*args)
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+# the code of the warmed up kernels and the warmups started by
+# `warmup_module` by the module name and the arguments
+_warmups: Dict[Tuple[Any, ...], Tuple[Tuple[Any, ...], Future]] = {}
+
+
+def find_kernels(module: ModuleType) -> List[kernel]:
+    namespaces = [vars(module)]
+    if hasattr(module, 'Analyzer'):
+        namespaces.append(vars(module.Analyzer))
+
+    kernels = []
+    for namespace in namespaces:
+        for value in namespace.values():
+            if isinstance(value, (staticmethod, classmethod)):
+                value = value.__func__
+            if isinstance(value, kernel) and value not in kernels:
+                kernels.append(value)
+    return kernels
+
+
+def _warmup_all(
+    kernels: List[kernel],
+    window_size: int,
+    channels: int,
+    dtype: np.dtype,
+    channel_major: bool,
+):
+    for k in kernels:
+        k.warmup(window_size, channels, dtype, channel_major)
+
+
+def warmup_module(
+    module: ModuleType,
+    window_size: int,
+    channels: int,
+    dtype: np.dtype = np.float32,
+) -> Future:
+    """Compile all kernels of an analyzer module in a background thread.
+
+    The kernels are compiled once when the module is loaded,
+    and the same future is returned to the later calls until the code
+    of the kernels is changed (e.g. the module is edited and reloaded).
+    The unchanged kernels of a reloaded module are loaded from the cache
+    on disk when they are called first.
+    """
+    global _executor
+
+    kernels = find_kernels(module)
+    if not is_available() or len(kernels) == 0:
+        future = Future()
+        future.set_result(None)
+        return future
+
+    # the layout of the signal passed to `Analyzer.analyze`
+    channel_major = getattr(
+        getattr(module, 'Analyzer', None), 'channel_major', True,
+    )
+    key = (module.__name__, window_size, channels, np.dtype(dtype))
+    code = tuple(k.python_function.__code__ for k in kernels)
+    entry = _warmups.get(key)
+    if entry is not None and entry[0] == code:
+        return entry[1]
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix='jit-warmup',
+        )
+    future = _executor.submit(
+        _warmup_all, kernels, window_size, channels, dtype, channel_major,
+    )
+    # replace the warmup of the old kernels
+    _warmups[key] = (code, future)
+    return future
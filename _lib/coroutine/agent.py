@@ -0,0 +1,296 @@
+import numpy as np
+
+from aiohttp import web, WSMsgType
+import aiohttp
+
+import asyncio
+import struct
+import time
+import zlib
+
+from .signal import signal_input, integer_scale, to_floating
+
+from typing import Union, Optional, Callable, Awaitable, Tuple
+
+
+# flags (uint8), reserved (3 bytes), sequence number (uint32),
+# UNIX time of the capture in seconds (float64), all in big endian,
+# followed by interleaved int16 samples in little endian
+BLOCK_HEADER_FORMAT = '>B3xId'
+BLOCK_HEADER_SIZE = struct.calcsize(BLOCK_HEADER_FORMAT)
+FLAG_ZLIB = 0x01
+
+
+def pack_block(
+    sequence: int,
+    timestamp: float,
+    block: np.ndarray,
+    compress: bool = False,
+) -> bytes:
+    # the inverse of `to_floating`
+    scale = integer_scale(np.int16)
+    samples = np.clip(np.round(block * scale), -scale, scale - 1.0)
+    payload = samples.astype('<i2').tobytes()
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload, 1)
+        flags |= FLAG_ZLIB
+    header = struct.pack(
+        BLOCK_HEADER_FORMAT,
+        flags,
+        sequence & 0xffffffff,
+        timestamp,
+    )
+    return header + payload
+
+
+def unpack_block(
+    data: bytes,
+    channels: int,
+) -> Tuple[int, float, np.ndarray]:
+    flags, sequence, timestamp = struct.unpack_from(BLOCK_HEADER_FORMAT, data)
+    payload = data[BLOCK_HEADER_SIZE:]
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    samples = np.frombuffer(payload, dtype='<i2').reshape(-1, channels)
+    return sequence, timestamp, to_floating(samples)
+
+
+class AgentSource:
+    """Feed the blocks of a capture agent to `put_block` in order.
+
+    Late (out-of-order or duplicated) blocks are dropped, and the blocks
+    lost in a gap of the sequence numbers are concealed with silence
+    so that the frames of the sessions stay aligned in time.
+    A gap longer than `max_concealed_blocks` is not concealed.
+    """
+    def __init__(
+        self,
+        name: str,
+        channels: int,
+        put_block: Callable[[np.ndarray], None],
+        max_concealed_blocks: int = 64,
+    ):
+        self.name = name
+        self.channels = channels
+        self.put_block = put_block
+        self.max_concealed_blocks = max_concealed_blocks
+
+        self.expected_sequence: Optional[int] = None
+        self.last_timestamp: Optional[float] = None
+        self.n_received = 0
+        self.n_lost = 0
+        self.n_late = 0
+
+    def receive(self, data: bytes):
+        sequence, timestamp, block = unpack_block(data, self.channels)
+        self.n_received += 1
+
+        if self.expected_sequence is not None:
+            gap = (sequence - self.expected_sequence) & 0xffffffff
+            if 0x80000000 <= gap:
+                self.n_late += 1
+                return
+            if 0 < gap:
+                self.n_lost += gap
+                if gap <= self.max_concealed_blocks:
+                    self.put_block(np.zeros(
+                        (gap * block.shape[0], self.channels),
+                        dtype=block.dtype,
+                    ))
+
+        self.expected_sequence = (sequence + 1) & 0xffffffff
+        self.last_timestamp = timestamp
+        self.put_block(block)
+
+    def to_client(self):
+        return {
+            'name': self.name,
+            'received': self.n_received,
+            'lost': self.n_lost,
+            'late': self.n_late,
+            'delay': (
+                None if self.last_timestamp is None
+                else time.time() - self.last_timestamp
+            ),
+        }
+
+
+class AgentServer:
+    """Accept capture agents (agent.py) streaming blocks over WebSocket.
+
+    An agent sends its name, sample rate and channels as JSON first,
+    and then the blocks made by `pack_block`. The blocks of each agent
+    are fed to the input source opened by `open_source` with the name.
+    """
+    def __init__(
+        self,
+        sample_rate: float,
+        channels: int,
+        open_source: Callable[[str], Callable[[np.ndarray], None]],
+        close_source: Callable[[str], Awaitable[None]],
+        reserved_names: Tuple[str, ...] = (),
+    ):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.open_source = open_source
+        self.close_source = close_source
+        self.reserved_names = reserved_names
+        self.agents: dict = dict()
+
+    async def handle(self, request: web.Request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        try:
+            hello = await ws.receive_json(timeout=10.0)
+            name = str(hello['name'])
+            sample_rate = float(hello['sample_rate'])
+            channels = int(hello['channels'])
+        except Exception:
+            await ws.close(message=b'Invalid handshake.')
+            return ws
+
+        if name in self.agents or name in self.reserved_names:
+            await ws.close(message='Agent name {!r} is in use.'.format(
+                name,
+            ).encode())
+            return ws
+        if sample_rate != self.sample_rate or channels != self.channels:
+            await ws.close(message='Expected {} Hz and {} channels.'.format(
+                self.sample_rate,
+                self.channels,
+            ).encode())
+            return ws
+
+        source = AgentSource(name, channels, self.open_source(name))
+        self.agents[name] = source
+        print('\nAgent {!r} connected.'.format(name))
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.BINARY:
+                    source.receive(message.data)
+        finally:
+            del self.agents[name]
+            await self.close_source(name)
+            print(
+                '\nAgent {name!r} disconnected '
+                '({received} received, {lost} lost, {late} late).'.format(
+                    **source.to_client()
+                )
+            )
+
+        return ws
+
+
+async def send_queued(
+    ws: aiohttp.ClientWebSocketResponse,
+    block_queue: asyncio.Queue,
+):
+    while not ws.closed:
+        packet = await block_queue.get()
+        await ws.send_bytes(packet)
+
+
+async def stream_blocks(
+    session: aiohttp.ClientSession,
+    url: str,
+    hello: dict,
+    block_queue: asyncio.Queue,
+):
+    """Send the queued blocks until the connection is closed,
+    and return the reason of the close.
+    """
+    async with session.ws_connect(url) as ws:
+        await ws.send_json(hello)
+        print('Connected to {}'.format(url))
+        sender = asyncio.get_event_loop().create_task(
+            send_queued(ws, block_queue),
+        )
+        try:
+            # the server sends nothing but the close frame
+            # with the reason (e.g. the handshake rejected)
+            message = await ws.receive()
+        finally:
+            sender.cancel()
+        if message.type == WSMsgType.ERROR:
+            return message.data
+        return message.extra or ws.close_code
+
+
+async def send_blocks(
+    url: str,
+    hello: dict,
+    block_queue: asyncio.Queue,
+    reconnect_interval: float,
+):
+    while True:
+        try:
+            async with aiohttp.ClientSession() as session:
+                reason = await stream_blocks(session, url, hello, block_queue)
+            print('Disconnected: {}'.format(reason))
+        except (aiohttp.ClientError, ConnectionError) as e:
+            print('Connection failed: {}'.format(e))
+        await asyncio.sleep(reconnect_interval)
+
+
+async def capture_agent_main(
+    url: str,
+    name: str,
+    sample_rate: float,
+    channels: int,
+    device: Optional[Union[int, str]],
+    block_size: int,
+    compress: bool,
+    max_queue: int = 64,
+    reconnect_interval: float = 1.0,
+):
+    loop = asyncio.get_event_loop()
+    event = asyncio.Event()
+    block_queue = asyncio.Queue(max_queue)
+    queue_info = {'sequence': 0, 'skip': 0}
+
+    def put_block(block: np.ndarray):
+        packet = pack_block(
+            queue_info['sequence'],
+            time.time(),
+            block,
+            compress,
+        )
+        # the skipped blocks are detected by the server as lost ones
+        queue_info['sequence'] += 1
+        try:
+            block_queue.put_nowait(packet)
+        except asyncio.QueueFull:
+            queue_info['skip'] += 1
+
+    input_task = loop.create_task(
+        signal_input(
+            loop=loop,
+            event=event,
+            put_block=put_block,
+            sample_rate=sample_rate,
+            channels=channels,
+            block_size=block_size,
+            device=device,
+            dtype=np.float32,
+        )
+    )
+    send_task = loop.create_task(send_blocks(
+        url,
+        {'name': name, 'sample_rate': sample_rate, 'channels': channels},
+        block_queue,
+        reconnect_interval,
+    ))
+    try:
+        await asyncio.wait(
+            [input_task, send_task],
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+    finally:
+        event.set()
+        send_task.cancel()
+        await asyncio.wait([input_task, send_task])
+
+    if input_task.exception() is not None:
+        raise input_task.exception()
@@ -7,58 +7,127 @@ import aiohttp_jinja2
 
 import asyncio
 import importlib
+import pkgutil
 import traceback
 
-from _lib.analyzer import analyzer_property
+from _lib.analyzer import BaseAnalyzer, analyzer_property, jit
+from _lib.util import DeltaEncoder
+from _lib.store import ResultStore
 from .signal import signal_input, signal_analysis
 
-from .core import AnalyzerInfo
+from .core import AnalyzerInfo, LOCAL_SOURCE
+from .quality import QualityController
+from .websocket import WebSocketServer
+from .agent import AgentServer
+from .parallel import ChannelPool
+from .jitter import JitterBuffer
 
-from typing import Dict, Awaitable
+from typing import (
+    Union, Optional, Tuple, List, Dict, Callable, Awaitable, Container,
+)
+
+
+def configure_analyzer_class(
+    analyzer_class: type,
+    sample_rate: float,
+    channels: int,
+    default_window_size: int,
+    default_frame_step: int,
+):
+    if hasattr(analyzer_class, 'sample_rate'):
+        prop = analyzer_class.sample_rate
+        if isinstance(prop, analyzer_property):
+            prop.default_value = sample_rate
+            prop.detail['readonly'] = True
+    if hasattr(analyzer_class, 'channels'):
+        prop = analyzer_class.channels
+        if isinstance(prop, analyzer_property):
+            prop.default_value = channels
+            prop.detail['readonly'] = True
+    if hasattr(analyzer_class, 'window_size'):
+        prop = analyzer_class.window_size
+        if isinstance(prop, analyzer_property):
+            prop.default_value = default_window_size
+    if hasattr(analyzer_class, 'frame_step'):
+        prop = analyzer_class.frame_step
+        if isinstance(prop, analyzer_property):
+            prop.default_value = default_frame_step
 
 
 def register_handlers(  # noqa: C901
-    sio: socketio.AsyncServer,
+    sio: Union[socketio.AsyncServer, WebSocketServer],
     analyzer_dict: Dict[str, AnalyzerInfo],
     sample_rate: int,
     channels: int,
     default_window_size: int,
     default_frame_step: int,
-    dtype: np.dtype = np.float32,
+    agent_sources: Container[str] = (),
 ):
-    async def on_start_analysis(sid: str, name: str):
+    async def on_start_analysis(
+        sid: str,
+        name: str,
+        options: Optional[dict] = None,
+    ):
+        if options is None:
+            options = {}
+        # the name of a capture agent to analyze instead of the local input
+        source = str(options.get('source') or LOCAL_SOURCE)
+        if source != LOCAL_SOURCE and source not in agent_sources:
+            await sio.emit(
+                'internal_error',
+                'The capture agent {!r} is not connected.'.format(source),
+                room=sid,
+            )
+            await sio.disconnect(sid)
+            return
         analyzer_module_name = 'analyzers.{}'.format(name)
         try:
             analyzer_module = importlib.import_module(analyzer_module_name)
             analyzer_class = analyzer_module.Analyzer
-            if hasattr(analyzer_class, 'sample_rate'):
-                prop = analyzer_class.sample_rate
-                if isinstance(prop, analyzer_property):
-                    prop.default_value = sample_rate
-                    prop.detail['readonly'] = True
-            if hasattr(analyzer_class, 'channels'):
-                prop = analyzer_class.channels
-                if isinstance(prop, analyzer_property):
-                    prop.default_value = channels
-                    prop.detail['readonly'] = True
-            if hasattr(analyzer_class, 'window_size'):
-                prop = analyzer_class.window_size
-                if isinstance(prop, analyzer_property):
-                    prop.default_value = default_window_size
-            if hasattr(analyzer_class, 'frame_step'):
-                prop = analyzer_class.frame_step
-                if isinstance(prop, analyzer_property):
-                    prop.default_value = default_frame_step
+            configure_analyzer_class(
+                analyzer_class,
+                sample_rate,
+                channels,
+                default_window_size,
+                default_frame_step,
+            )
+
+            # the JIT kernels are compiled once when the module is loaded
+            # (or by --prewarm), and later sessions do not wait for them
+            await asyncio.wrap_future(
+                jit.warmup_module(
+                    analyzer_module,
+                    default_window_size,
+                    channels,
+                    analyzer_class.resolve_dtype(),
+                )
+            )
 
             analyzer = analyzer_class()
+            # the plot width reported by the client in the handshake
+            if hasattr(analyzer_class, 'display_width'):
+                prop = analyzer_class.display_width
+                value = options.get('display_width')
+                if isinstance(prop, analyzer_property):
+                    prop.detail['readonly'] = True
+                    if isinstance(value, int) and 0 < value:
+                        analyzer.display_width = value
             data = analyzer.get_client_property_details()
 
             analyzer_info = AnalyzerInfo(
                 sid,
+                sio,
                 analyzer,
-                np.zeros((default_window_size, channels), dtype=dtype),
+                np.zeros(
+                    (channels, default_window_size),
+                    dtype=analyzer.dtype,
+                ),
                 default_frame_step,
                 0,
+                DeltaEncoder(analyzer.delta_threshold),
+                QualityController(sample_rate, analyzer.quality_levels),
+                name,
+                source,
             )
             analyzer_dict[sid] = analyzer_info
 
@@ -86,40 +155,228 @@ def register_handlers(  # noqa: C901
                 if not isinstance(value, int):
                     continue
                 old_buf = info.buffer
-                new_buf = np.zeros((value, channels), dtype=dtype)
-                length = min(new_buf.shape[0], old_buf.shape[0])
-                left_length = new_buf.shape[0] - length
-                new_buf[left_length:] = old_buf[old_buf.shape[0] - length:]
+                new_buf = np.zeros(
+                    (channels, value),
+                    dtype=info.analyzer.dtype,
+                )
+                length = min(new_buf.shape[1], old_buf.shape[1])
+                left_length = new_buf.shape[1] - length
+                new_buf[:, left_length:] = old_buf[
+                    :,
+                    old_buf.shape[1] - length:,
+                ]
                 info.buffer = new_buf
                 info.next_frame = 0
+                # not analyzed until the zero padding is filled
+                info.refill = max(info.refill, left_length)
+                if info.quality is not None:
+                    info.quality.reset()
             elif attr_name == 'frame_step':
                 if not isinstance(value, int) or value <= 0:
                     continue
                 info.frame_step = value
                 info.next_frame = 0
+                # the load was measured against the old budget
+                if info.quality is not None:
+                    info.quality.reset()
             setattr(info.analyzer, attr_name, value)
         data = info.analyzer.get_client_properties(properties.keys())
         await sio.emit('properties', data, room=sid)
 
+    def on_drop(sid: str):
+        # the client missed the deltas, so the next results are sent whole
+        if sid in analyzer_dict:
+            analyzer_dict[sid].encoder.reset()
+
     sio.on('start_analysis', on_start_analysis)
     sio.on('disconnect', on_disconnect)
     sio.on('set_properties', on_set_properties)
+    if isinstance(sio, WebSocketServer):
+        sio.on_drop(on_drop)
+
+
+async def prewarm_analyzers(
+    loop: asyncio.AbstractEventLoop,
+    sample_rate: float,
+    channels: int,
+    default_window_size: int,
+    default_frame_step: int,
+):
+    """Import and instantiate all analyzers in the background
+    so that the first client does not wait for the heavy imports,
+    the filterbanks and the JIT compilation.
+    """
+    import analyzers
+    names = [
+        name
+        for _, name, _ in pkgutil.walk_packages(analyzers.__path__)
+    ]
+    for name in names:
+        try:
+            module = await loop.run_in_executor(
+                None,
+                importlib.import_module,
+                'analyzers.{}'.format(name),
+            )
+            configure_analyzer_class(
+                module.Analyzer,
+                sample_rate,
+                channels,
+                default_window_size,
+                default_frame_step,
+            )
+            await asyncio.wrap_future(
+                jit.warmup_module(
+                    module,
+                    default_window_size,
+                    channels,
+                    module.Analyzer.resolve_dtype(),
+                )
+            )
+            await loop.run_in_executor(None, module.Analyzer)
+        except Exception:
+            print('\nFailed to prewarm the analyzer {!r}.'.format(name))
+            traceback.print_exc()
+
+
+async def catch_task_exception(
+    awaitable: Awaitable[None],
+    exception_queue: asyncio.Queue,
+):
+    try:
+        await awaitable
+    except Exception as e:
+        await exception_queue.put(e)
+
+
+def connect_jitter_buffer(
+    jitter: JitterBuffer,
+    queue_info: Dict[str, int],
+) -> Tuple[
+    Callable[[np.ndarray], None],
+    Callable[[], Awaitable[Optional[Tuple[np.ndarray, int]]]],
+]:
+    """`put_block` and `get_block` of a jitter buffer counting
+    the blocks analyzed and the samples skipped in `queue_info`.
+    """
+    def put_block(block: np.ndarray):
+        queue_info['skip'] += jitter.put(block)
+
+    async def get_block():
+        item = await jitter.get()
+        if item is not None:
+            queue_info['get'] += 1
+        return item
+
+    return put_block, get_block
+
+
+class AgentSources:
+    """Input sources of the capture agents, each analyzed by its own task.
+
+    When an agent disconnects, its sessions are told by `internal_error`
+    and disconnected since they would get no more results.
+    """
+    def __init__(
+        self,
+        analyzer_dict: Dict[str, AnalyzerInfo],
+        sample_rate: float,
+        create_jitter_buffer: Callable[[], JitterBuffer],
+        queue_info: Dict[str, int],
+        exception_queue: asyncio.Queue,
+        store: Optional[ResultStore] = None,
+        pool: Optional[ChannelPool] = None,
+    ):
+        self.analyzer_dict = analyzer_dict
+        self.sample_rate = sample_rate
+        self.create_jitter_buffer = create_jitter_buffer
+        self.queue_info = queue_info
+        self.exception_queue = exception_queue
+        self.store = store
+        self.pool = pool
+        self.sources: Dict[str, Tuple[JitterBuffer, asyncio.Task]] = dict()
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.sources
+
+    def latencies(self) -> List[Tuple[str, float]]:
+        return [
+            (name, source_jitter.latency)
+            for name, (source_jitter, _) in list(self.sources.items())
+        ]
+
+    def open(self, name: str) -> Callable[[np.ndarray], None]:
+        source_jitter = self.create_jitter_buffer()
+        put_block, get_block = connect_jitter_buffer(
+            source_jitter,
+            self.queue_info,
+        )
+        task = asyncio.get_event_loop().create_task(
+            catch_task_exception(
+                signal_analysis(
+                    analyzer_dict=self.analyzer_dict,
+                    get_block=get_block,
+                    sample_rate=self.sample_rate,
+                    store=self.store,
+                    source=name,
+                    pool=self.pool,
+                ),
+                self.exception_queue,
+            )
+        )
+        self.sources[name] = (source_jitter, task)
+        return put_block
+
+    async def close(self, name: str):
+        source_jitter, task = self.sources.pop(name)
+        source_jitter.clear()
+        source_jitter.close()
+        await task
+
+        for info in list(self.analyzer_dict.values()):
+            if info.source != name:
+                continue
+            await info.server.emit(
+                'internal_error',
+                'The capture agent {!r} disconnected.'.format(name),
+                room=info.sid,
+            )
+            await info.server.disconnect(info.sid)
 
 
 async def display_queue_info(
-    indata_queue: asyncio.Queue,
+    jitter: JitterBuffer,
+    sample_rate: float,
     queue_info: Dict[str, int],
     exception_queue: asyncio.Queue,
+    analyzer_dict: Dict[str, AnalyzerInfo],
+    agent_sources: Optional[AgentSources] = None,
 ):
     while exception_queue.qsize() == 0:
+        n_degraded = sum(
+            1
+            for info in list(analyzer_dict.values())
+            if info.quality is not None and info.quality.degraded
+        )
+        # the latencies of the capture agents besides the local input
+        buffered = ''.join(
+            ', {} {:.0f} ms'.format(name, latency * 1000.0)
+            for name, latency in (
+                agent_sources.latencies() if agent_sources is not None else []
+            )
+        )
         print(
             '    \r'
-            '{} blocks queued, '
-            '{} blocks skipped, '
-            '{} blocks analyzed.'.format(
-                indata_queue.qsize(),
-                queue_info['skip'],
+            '{:.0f} ms buffered{}, '
+            '{:.0f} ms skipped, '
+            '{} blocks analyzed, '
+            '{}/{} sessions degraded.'.format(
+                jitter.latency * 1000.0,
+                buffered,
+                queue_info['skip'] * 1000.0 / sample_rate,
                 queue_info['get'],
+                n_degraded,
+                len(analyzer_dict),
             ),
             end='',
             flush=True,
@@ -129,45 +386,137 @@ async def display_queue_info(
         await asyncio.sleep(2.0)
 
 
+def print_settings(
+    host: str,
+    port: int,
+    skip: bool,
+    websocket: bool,
+    store_path: Optional[str],
+    local_input: bool,
+    agents: bool,
+    dtype: str,
+    capture_dtype: str,
+    analysis_workers: int,
+    target_latency: float,
+    max_latency: float,
+):
+    print('Launch at http://{}:{}'.format(host, port))
+    print('Press Ctrl+C to quit.')
+    if skip:
+        print(
+            '* Overflowed frames will be skipped'
+            ' (target latency {:.0f} ms, max latency {:.0f} ms).'.format(
+                target_latency,
+                max_latency,
+            )
+        )
+    if websocket:
+        print('* The raw WebSocket transport is enabled.')
+    if store_path is not None:
+        print('* The results are stored in {}.'.format(store_path))
+    if agents:
+        print('* Capture agents are accepted at ws://{}:{}/agent.'.format(
+            host,
+            port,
+        ))
+    if not local_input:
+        print('* The local input device is not used.')
+    print('* The analysis runs in {} (captured in {}).'.format(
+        dtype,
+        capture_dtype,
+    ))
+    if analysis_workers:
+        print('* The channels are analyzed by {} threads.'.format(
+            analysis_workers,
+        ))
+
+
 async def application_main(
     host: str,
     port: int,
     sample_rate: float,
     channels: int,
-    device: int,
+    device: Optional[int],
     default_window_size: int,
     default_frame_step: int,
     skip: bool,
+    websocket: bool = False,
+    store_path: Optional[str] = None,
+    store_raw_retention: float = 600.0,
+    local_input: bool = True,
+    agents: bool = False,
+    prewarm: bool = False,
+    dtype: str = 'float32',
+    capture_dtype: str = 'float32',
+    analysis_workers: int = 0,
+    target_latency: float = 50.0,
+    max_latency: float = 200.0,
 ):
+    # the precision of the buffers, the analysis and the results
+    # (unless an analyzer specifies its own precision)
+    BaseAnalyzer.default_dtype = np.dtype(dtype)
     loop = asyncio.get_event_loop()
     event = asyncio.Event()
-    indata_queue = asyncio.Queue(1 if skip else 0)
     exception_queue = asyncio.Queue()
     analyzer_dict: Dict[str, AnalyzerInfo] = dict()
+    # the number of the blocks analyzed and the samples skipped
     queue_info = {'get': 0, 'skip': 0}
 
-    def put_block(block: np.ndarray):
-        try:
-            indata_queue.put_nowait(block)
-        except asyncio.QueueFull:
-            queue_info['skip'] += 1
+    def create_jitter_buffer():
+        # the latencies are in milliseconds and unbounded without skip
+        return JitterBuffer(
+            sample_rate,
+            target_latency=target_latency / 1000.0,
+            max_latency=max_latency / 1000.0 if skip else None,
+        )
 
-    async def get_block():
-        buffer = await indata_queue.get()
-        if buffer is not None:
-            queue_info['get'] += 1
-        return buffer
+    jitter = create_jitter_buffer()
+    put_block, get_block = connect_jitter_buffer(jitter, queue_info)
 
-    from routes import routes
+    from routes import routes, static_files
     app = web.Application()
     sio = socketio.AsyncServer(async_mode='aiohttp')
     # Require to attach firstly
     sio.attach(app)
     app.add_routes(routes)
-    aiohttp_jinja2.setup(
+    env = aiohttp_jinja2.setup(
         app,
         loader=jinja2.FileSystemLoader(['analyzers', '_template']),
     )
+    # `{{ asset_url('/dist/bundle.js') }}` in the templates
+    env.globals['asset_url'] = static_files.url
+
+    store = None
+    if store_path is not None:
+        # served by the routes '/store' in routes.py
+        store = ResultStore(store_path, raw_retention=store_raw_retention)
+        store.start()
+        app['result_store'] = store
+
+    pool = None
+    if 1 < analysis_workers:
+        # for the channel-independent analyzers
+        pool = ChannelPool(analysis_workers)
+
+    agent_sources = AgentSources(
+        analyzer_dict=analyzer_dict,
+        sample_rate=sample_rate,
+        create_jitter_buffer=create_jitter_buffer,
+        queue_info=queue_info,
+        exception_queue=exception_queue,
+        store=store,
+        pool=pool,
+    )
+    if agents:
+        # served by the routes '/agent' and '/agents' in routes.py
+        app['agent_server'] = AgentServer(
+            sample_rate=sample_rate,
+            channels=channels,
+            open_source=agent_sources.open,
+            close_source=agent_sources.close,
+            reserved_names=(LOCAL_SOURCE,),
+        )
+
     register_handlers(
         sio=sio,
         analyzer_dict=analyzer_dict,
@@ -175,60 +524,111 @@ async def application_main(
         channels=channels,
         default_window_size=default_window_size,
         default_frame_step=default_frame_step,
+        agent_sources=agent_sources,
     )
+    if websocket:
+        # served by the route '/ws' in routes.py
+        ws_server = WebSocketServer()
+        app['websocket_server'] = ws_server
+        register_handlers(
+            sio=ws_server,
+            analyzer_dict=analyzer_dict,
+            sample_rate=sample_rate,
+            channels=channels,
+            default_window_size=default_window_size,
+            default_frame_step=default_frame_step,
+            agent_sources=agent_sources,
+        )
 
-    print('Launch at http://{}:{}'.format(host, port))
-    print('Press Ctrl+C to quit.')
-    if skip:
-        print('* Overflowed segments will be skipped.')
+    print_settings(
+        host=host,
+        port=port,
+        skip=skip,
+        websocket=websocket,
+        store_path=store_path,
+        local_input=local_input,
+        agents=agents,
+        dtype=dtype,
+        capture_dtype=capture_dtype,
+        analysis_workers=analysis_workers if pool is not None else 0,
+        target_latency=target_latency,
+        max_latency=max_latency,
+    )
 
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, host, port)
     await site.start()
 
-    async def catch_task_exception(awaitable: Awaitable[None]):
-        try:
-            await awaitable
-        except Exception as e:
-            await exception_queue.put(e)
-
-    input_task = loop.create_task(
-        catch_task_exception(
-            signal_input(
-                loop=loop,
-                event=event,
-                put_block=put_block,
-                sample_rate=sample_rate,
-                channels=channels,
-                block_size=0,
-                device=device,
-                dtype=np.float32,
-            ),
+    if local_input:
+        input_task = loop.create_task(
+            catch_task_exception(
+                signal_input(
+                    loop=loop,
+                    event=event,
+                    put_block=put_block,
+                    sample_rate=sample_rate,
+                    channels=channels,
+                    block_size=0,
+                    device=device,
+                    dtype=capture_dtype,
+                ),
+                exception_queue,
+            )
         )
-    )
+    else:
+        input_task = loop.create_task(event.wait())
     analysis_task = loop.create_task(
         catch_task_exception(
             signal_analysis(
-                sio=sio,
                 analyzer_dict=analyzer_dict,
                 get_block=get_block,
-            )
+                sample_rate=sample_rate,
+                store=store,
+                pool=pool,
+            ),
+            exception_queue,
         )
     )
+    prewarm_task = None
+    if prewarm:
+        prewarm_task = loop.create_task(
+            prewarm_analyzers(
+                loop=loop,
+                sample_rate=sample_rate,
+                channels=channels,
+                default_window_size=default_window_size,
+                default_frame_step=default_frame_step,
+            )
+        )
     # Sleep a short time in order to catch exceptions
     # from the above tasks immediately.
     await asyncio.sleep(0.1)
 
     try:
-        await display_queue_info(indata_queue, queue_info, exception_queue)
+        await display_queue_info(
+            jitter,
+            sample_rate,
+            queue_info,
+            exception_queue,
+            analyzer_dict,
+            agent_sources,
+        )
     finally:
-        while not indata_queue.empty():
-            indata_queue.get_nowait()
-        await indata_queue.put(None)
+        jitter.clear()
+        jitter.close()
         event.set()
-        await asyncio.wait([input_task, analysis_task])
+        tasks = [input_task, analysis_task]
+        if prewarm_task is not None:
+            prewarm_task.cancel()
+            # wait for the cancellation (not raised by asyncio.wait)
+            tasks.append(prewarm_task)
+        await asyncio.wait(tasks)
         await runner.cleanup()
+        if store is not None:
+            await loop.run_in_executor(None, store.close)
+        if pool is not None:
+            pool.close()
 
     if not exception_queue.empty():
         raise exception_queue.get_nowait()
@@ -1,14 +1,35 @@
 import numpy as np
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from _lib.analyzer import BaseAnalyzer
+from _lib.util import DeltaEncoder
+
+from .quality import QualityController
+
+from typing import Any, Optional
+
+
+# the name of the input source of the audio device of the server
+LOCAL_SOURCE = 'local'
 
 
 @dataclass
 class AnalyzerInfo:
     sid: str
+    # socketio.AsyncServer or WebSocketServer the session belongs to
+    server: Any
     analyzer: BaseAnalyzer
+    # the last samples of the shape (channels, window_size)
     buffer: np.ndarray
     frame_step: int
     next_frame: int
+    encoder: DeltaEncoder = field(default_factory=DeltaEncoder)
+    quality: Optional[QualityController] = None
+    # the name of the analyzer module in the `analyzers` package
+    name: str = ''
+    # the name of the input source (LOCAL_SOURCE or a capture agent)
+    source: str = LOCAL_SOURCE
+    # the samples to receive before the next frame is analyzed
+    # (the buffer is refilled after a gap or a larger window size)
+    refill: int = 0
@@ -0,0 +1,97 @@
+import numpy as np
+
+import asyncio
+import collections
+
+from typing import Optional, Tuple, Deque
+
+
+class JitterBuffer:
+    """Queue of the input blocks bounded by the latency.
+
+    When more than `max_latency` seconds of samples are queued
+    (e.g. after the analysis stalled), the oldest samples are dropped
+    down to `target_latency`, and the number of the dropped samples is
+    returned with the next block (each session realigns its own frames).
+    No samples are dropped if `max_latency` is None.
+    """
+    def __init__(
+        self,
+        sample_rate: float,
+        target_latency: float = 0.05,
+        max_latency: Optional[float] = 0.2,
+    ):
+        self.sample_rate = sample_rate
+        self.target_size = int(round(target_latency * sample_rate))
+        self.max_size = None
+        if max_latency is not None:
+            self.max_size = max(
+                self.target_size,
+                int(round(max_latency * sample_rate)),
+            )
+
+        self._blocks: Deque[np.ndarray] = collections.deque()
+        self._size = 0
+        # the samples dropped before the next block
+        self._dropped = 0
+        self._closed = False
+        self._event = asyncio.Event()
+
+    @property
+    def latency(self) -> float:
+        """The queued samples in seconds.
+        """
+        return self._size / self.sample_rate
+
+    def put(self, block: np.ndarray) -> int:
+        """Append a block of the shape (frames, channels).
+
+        Return the number of the samples dropped to catch up.
+        """
+        self._blocks.append(block)
+        self._size += block.shape[0]
+        dropped = 0
+        if self.max_size is not None and self.max_size < self._size:
+            dropped = self._size - self.target_size
+            self._drop(dropped)
+        self._event.set()
+        return dropped
+
+    def _drop(self, length: int):
+        self._size -= length
+        self._dropped += length
+        while 0 < length:
+            block = self._blocks[0]
+            if block.shape[0] <= length:
+                self._blocks.popleft()
+                length -= block.shape[0]
+            else:
+                self._blocks[0] = block[length:]
+                length = 0
+
+    def close(self):
+        """Make `get` return None after the queued blocks.
+        """
+        self._closed = True
+        self._event.set()
+
+    def clear(self):
+        self._blocks.clear()
+        self._size = 0
+
+    async def get(self) -> Optional[Tuple[np.ndarray, int]]:
+        """Wait for the next block.
+
+        Return the block and the number of the samples dropped before it,
+        or None when closed.
+        """
+        while not self._blocks:
+            if self._closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        block = self._blocks.popleft()
+        self._size -= block.shape[0]
+        dropped = self._dropped
+        self._dropped = 0
+        return block, dropped
@@ -0,0 +1,75 @@
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+
+from _lib.analyzer import BaseAnalyzer
+
+from typing import Any, Iterable, List, Dict
+
+
+def channel_groups(channels: int, n_groups: int) -> List[slice]:
+    """Split the channels into contiguous groups of almost the same size.
+    """
+    n_groups = max(1, min(n_groups, channels))
+    bounds = np.linspace(0, channels, n_groups + 1).round().astype(int)
+    return [slice(start, end) for start, end in zip(bounds, bounds[1:])]
+
+
+def merge_results(
+    results_list: List[Dict[str, Any]],
+    channel_results: Iterable[str],
+) -> Dict[str, Any]:
+    """Reassemble the results of the groups of channels.
+
+    The `channel_results` of the groups are concatenated in the order
+    of the channels and the others are taken from the first group.
+    """
+    merged = dict(results_list[0])
+    for name in channel_results:
+        values = [results[name] for results in results_list]
+        if isinstance(values[0], np.ndarray):
+            merged[name] = np.concatenate(values)
+        else:
+            merged[name] = [item for value in values for item in value]
+    return merged
+
+
+class ChannelPool:
+    """Analyze the groups of channels of the channel-independent analyzers
+    in parallel.
+
+    The threads run in parallel while numpy and scipy.fft release the GIL.
+    One of the groups is analyzed in the calling thread.
+    """
+    def __init__(self, workers: int, min_group_channels: int = 1):
+        self.workers = max(1, workers)
+        self.min_group_channels = max(1, min_group_channels)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, self.workers - 1),
+            thread_name_prefix='analysis',
+        )
+
+    def analyze(self, analyzer: BaseAnalyzer, signal: np.ndarray):
+        channel_axis = 0 if analyzer.channel_major else 1
+        channels = signal.shape[channel_axis]
+        n_groups = min(self.workers, channels // self.min_group_channels)
+        if not analyzer.channel_independent or n_groups <= 1:
+            return analyzer.analyze(signal)
+
+        def analyze_group(group: slice):
+            if analyzer.channel_major:
+                # the contiguous rows of the channel-major signal
+                return analyzer.analyze(signal[group])
+            return analyzer.analyze(np.ascontiguousarray(signal[:, group]))
+
+        groups = channel_groups(channels, n_groups)
+        futures = [
+            self._executor.submit(analyze_group, group)
+            for group in groups[1:]
+        ]
+        results_list = [analyze_group(groups[0])]
+        results_list.extend(future.result() for future in futures)
+        return merge_results(results_list, analyzer.channel_results)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
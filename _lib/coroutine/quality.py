@@ -0,0 +1,100 @@
+from typing import Optional
+
+
+class QualityController:
+    """Degrade an analyzer gracefully when it exceeds its real-time budget.
+
+    The time spent in `analyze` is averaged exponentially and compared
+    with the duration of the frames it covers (the budget).
+    An overloaded analyzer is switched to the cheaper quality levels
+    declared by `BaseAnalyzer.quality_levels` first, and then analyzes
+    only every `decimation`-th frame (doubled at each step).
+    The degradation is undone step by step once the load drops.
+    """
+    def __init__(
+        self,
+        sample_rate: float,
+        quality_levels: int = 1,
+        smoothing: float = 0.2,
+        high_load: float = 0.9,
+        low_load: float = 0.3,
+        min_samples: int = 8,
+        max_decimation: int = 64,
+    ):
+        self.sample_rate = sample_rate
+        self.quality_levels = max(1, quality_levels)
+        self.smoothing = smoothing
+        self.high_load = high_load
+        self.low_load = low_load
+        self.min_samples = min_samples
+        self.max_decimation = max_decimation
+
+        self.level = 0
+        self.load = 0.0
+        self.average_cost: Optional[float] = None
+        self.n_samples = 0
+        self.n_skipped = 0
+
+    @property
+    def quality(self):
+        """Quality level of the analyzer (0 is the full quality)."""
+        return min(self.level, self.quality_levels - 1)
+
+    @property
+    def decimation(self):
+        return 2 ** max(0, self.level - (self.quality_levels - 1))
+
+    @property
+    def degraded(self):
+        return 0 < self.level
+
+    def should_analyze(self):
+        """Whether to analyze the frame completed now or skip it."""
+        self.n_skipped += 1
+        if self.decimation <= self.n_skipped:
+            self.n_skipped = 0
+            return True
+        return False
+
+    def update(self, cost: float, frame_step: int):
+        """Record the seconds spent in `analyze`.
+
+        Return True when the degradation level is changed.
+        """
+        if self.average_cost is None:
+            self.average_cost = cost
+        else:
+            self.average_cost += self.smoothing * (cost - self.average_cost)
+        self.n_samples += 1
+
+        budget = self.decimation * frame_step / self.sample_rate
+        self.load = self.average_cost / budget
+        if self.n_samples < self.min_samples:
+            return False
+
+        if self.high_load < self.load:
+            if self.max_decimation <= self.decimation:
+                return False
+            self.level += 1
+        elif self.load < self.low_load and 0 < self.level:
+            self.level -= 1
+        else:
+            return False
+
+        # measure again at the new level
+        self.reset()
+        return True
+
+    def reset(self):
+        """Forget the measured load (e.g. when the budget is changed).
+        """
+        self.average_cost = None
+        self.n_samples = 0
+        self.n_skipped = 0
+
+    def to_client(self):
+        return {
+            'quality': self.quality,
+            'decimation': self.decimation,
+            'load': self.load,
+        }
@@ -1,16 +1,16 @@
 import numpy as np
-import sounddevice as sd
-
-import socketio
 
 import asyncio
+import time
 import traceback
 
-from _lib.util import numpy_to_bytes
+from _lib.store import ResultStore, series_prefix
+from _lib.util import cast_floating
 
-from .core import AnalyzerInfo
+from .core import AnalyzerInfo, LOCAL_SOURCE
+from .parallel import ChannelPool
 
-from typing import Union, Optional, Callable, Awaitable, Dict
+from typing import Union, Optional, Callable, Awaitable, Tuple, Dict
 
 
 async def signal_input(
@@ -23,6 +23,9 @@ async def signal_input(
     device: Optional[Union[int, str]] = None,
     dtype: np.dtype = np.float32,
 ):
+    # PortAudio is initialized on the first import
+    import sounddevice as sd
+
     def callback(indata: np.ndarray, frames, time, status):
         loop.call_soon_threadsafe(put_block, indata.copy())
 
@@ -37,51 +40,172 @@ async def signal_input(
         await event.wait()
 
 
+# the analyzer classes already warned about upcasts
+_upcast_warned = set()
+
+
+def check_precision(info: AnalyzerInfo, results):
+    """Cast the results into the precision of the analyzer
+    and warn once per analyzer about accidental upcasts.
+    """
+    dtype = info.analyzer.dtype
+    results, upcasts = cast_floating(results, dtype)
+    analyzer_class = type(info.analyzer)
+    if upcasts and analyzer_class not in _upcast_warned:
+        _upcast_warned.add(analyzer_class)
+        print(
+            '\nWarning: the analyzer {!r} returned {} arrays '
+            'though its precision is {}.'.format(
+                info.name,
+                ', '.join(sorted(str(upcast) for upcast in upcasts)),
+                dtype,
+            )
+        )
+    return results
+
+
+def integer_scale(dtype: np.dtype) -> float:
+    """The full scale of integer samples (e.g. 32768 for int16).
+    """
+    return float(np.iinfo(dtype).max) + 1.0
+
+
+def to_floating(block: np.ndarray) -> np.ndarray:
+    """Scale integer samples (e.g. int16 capture) into [-1.0, 1.0).
+    """
+    if block.dtype.kind in 'iu':
+        scale = integer_scale(block.dtype)
+        return block.astype(np.float32) * np.float32(1.0 / scale)
+    return block
+
+
+def frame_signal(info: AnalyzerInfo) -> np.ndarray:
+    """Copy the channel-major buffer into the signal of the analyzer.
+    """
+    if info.analyzer.channel_major:
+        return np.copy(info.buffer)
+    # (window_size, channels) in the C order as before
+    return np.ascontiguousarray(info.buffer.T)
+
+
+async def analyze_frame(
+    info: AnalyzerInfo,
+    store: Optional[ResultStore] = None,
+    pool: Optional[ChannelPool] = None,
+):
+    """Analyze the current buffer of a session and emit the results.
+    """
+    start_time = time.perf_counter()
+    signal = frame_signal(info)
+    if pool is None:
+        results = info.analyzer.analyze(signal)
+    else:
+        # split by the channels if channel-independent
+        results = pool.analyze(info.analyzer, signal)
+    cost = time.perf_counter() - start_time
+    results = check_precision(info, results)
+
+    if store is not None:
+        # copied now and written in the background
+        store.put(
+            series_prefix(info.name, info.source, info.buffer.shape[1]),
+            results,
+        )
+
+    quality = info.quality
+    if quality is not None and quality.update(cost, info.frame_step):
+        info.analyzer.quality = quality.quality
+        info.analyzer.decimation = quality.decimation
+        await info.server.emit(
+            'quality',
+            data=quality.to_client(),
+            room=info.sid,
+        )
+
+    await info.server.emit(
+        'results',
+        # unchanged arrays are not resent
+        data=info.encoder.encode(results),
+        room=info.sid,
+    )
+
+
+async def feed_block(
+    info: AnalyzerInfo,
+    block: np.ndarray,
+    dropped: int,
+    store: Optional[ResultStore] = None,
+    pool: Optional[ChannelPool] = None,
+):
+    """Shift a block into the buffer of a session frame by frame.
+    """
+    if 0 < dropped:
+        # keep the frames on the grid of the frame step
+        # and suppress them until the buffer is refilled
+        # instead of analyzing a window across the gap
+        info.next_frame = (info.next_frame + dropped) % info.frame_step
+        info.refill = info.buffer.shape[1]
+        info.analyzer.reset()
+    block_size = block.shape[0]
+    # This whlie-loop must be as is (not change it into for-loop)
+    # because the frame-step may be changed.
+    frame = 0
+    while frame < block_size:
+        # channel-major (channels, window_size)
+        buffer = info.buffer
+        buffer_size = buffer.shape[1]
+        required_length = min(
+            info.frame_step - info.next_frame,
+            buffer_size,
+        )
+        length = min(required_length, block_size - frame)
+        left_length = buffer_size - length
+        buffer[:, :left_length] = buffer[:, length:]
+        buffer[:, left_length:] = block[frame:frame + length].T
+        info.refill = max(0, info.refill - length)
+        frame += length
+
+        if length < required_length:
+            info.next_frame += length
+            continue
+        info.next_frame = 0
+        # the window still has samples before the gap,
+        # or the frame is skipped by the quality control
+        if 0 < info.refill:
+            continue
+        if info.quality is None or info.quality.should_analyze():
+            await analyze_frame(info, store, pool)
+
+
 async def signal_analysis(
-    sio: socketio.AsyncServer,
     analyzer_dict: Dict[str, AnalyzerInfo],
-    get_block: Callable[[], Awaitable[Union[None, np.ndarray]]],
+    # a block and the samples dropped before it (None to stop)
+    get_block: Callable[[], Awaitable[Optional[Tuple[np.ndarray, int]]]],
+    sample_rate: float,
+    store: Optional[ResultStore] = None,
+    source: str = LOCAL_SOURCE,
+    pool: Optional[ChannelPool] = None,
 ):
     while True:
-        block = await get_block()
-        if block is None:
+        item = await get_block()
+        if item is None:
             break
+        block, dropped = item
+        # converted once here and cast into the precision of each buffer
+        block = to_floating(block)
 
-        info_list = list(analyzer_dict.values())
+        info_list = [
+            info
+            for info in list(analyzer_dict.values())
+            if info.source == source
+        ]
         for info in info_list:
             try:
-                block_size = block.shape[0]
-                # This whlie-loop must be as is (not change it into for-loop)
-                # because the frame-step may be changed.
-                frame = 0
-                while frame < block_size:
-                    buffer = info.buffer
-                    buffer_size = buffer.shape[0]
-                    required_length = min(
-                        info.frame_step - info.next_frame,
-                        buffer_size,
-                    )
-                    length = min(required_length, block_size - frame)
-                    left_length = buffer_size - length
-                    buffer[:left_length] = buffer[length:]
-                    buffer[left_length:] = block[frame:frame + length]
-
-                    if required_length <= length:
-                        results = info.analyzer.analyze(np.copy(buffer))
-
-                        await sio.emit(
-                            'results',
-                            data=numpy_to_bytes(results),
-                            room=info.sid,
-                        )
-                        info.next_frame = 0
-                    else:
-                        info.next_frame += length
-                    frame += length
+                await feed_block(info, block, dropped, store, pool)
             except Exception:
-                await sio.emit(
+                await info.server.emit(
                     'internal_error',
                     data=traceback.format_exc(),
                     room=info.sid,
                 )
-                await sio.disconnect(info.sid)
+                await info.server.disconnect(info.sid)
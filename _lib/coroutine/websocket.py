@@ -0,0 +1,152 @@
+from aiohttp import web, WSMsgType
+
+import asyncio
+import collections
+import uuid
+import traceback
+
+from _lib.util import PortableType, pack_message, unpack_message
+
+from typing import Any, Callable, Awaitable, Optional, Tuple, Dict, Deque
+
+
+class _Outbox:
+    """Messages of a WebSocket sent by its own task.
+
+    `put` never waits for a slow client. When more than `max_results`
+    results are pending, they are all stale and dropped together with
+    the new one, and `on_drop` is called (the next results must not be
+    a delta from the dropped ones). The other events are never dropped.
+    `close` closes the WebSocket after the queued messages are sent.
+    """
+    def __init__(
+        self,
+        ws: web.WebSocketResponse,
+        max_results: int,
+        on_drop: Callable[[], None],
+    ):
+        self.ws = ws
+        self.max_results = max_results
+        self.on_drop = on_drop
+        self._messages: Deque[Tuple[str, Optional[bytes]]] = (
+            collections.deque()
+        )
+        self._n_results = 0
+        self._event = asyncio.Event()
+
+    def put(self, event: str, packet: bytes):
+        if event == 'results':
+            if self.max_results <= self._n_results:
+                self._messages = collections.deque(
+                    message
+                    for message in self._messages
+                    if message[0] != 'results'
+                )
+                self._n_results = 0
+                self.on_drop()
+                return
+            self._n_results += 1
+        self._messages.append((event, packet))
+        self._event.set()
+
+    def close(self):
+        self._messages.append(('', None))
+        self._event.set()
+
+    async def run(self):
+        while not self.ws.closed:
+            if not self._messages:
+                self._event.clear()
+                await self._event.wait()
+                continue
+            event, packet = self._messages.popleft()
+            if event == 'results':
+                self._n_results -= 1
+            try:
+                if packet is None:
+                    await self.ws.close()
+                    break
+                await self.ws.send_bytes(packet)
+            except ConnectionError:
+                # closed by the client (the handler cleans up)
+                break
+
+
+class WebSocketServer:
+    """Lightweight alternative to `socketio.AsyncServer`.
+
+    The same events are exchanged over aiohttp's native WebSocket
+    as single binary messages made by `pack_message`.
+    Only `on`, `emit` and `disconnect` of `socketio.AsyncServer`
+    are supported, with a session ID per WebSocket as the room.
+    Like socket.io, `emit` only queues the message (see `_Outbox`),
+    and the dead clients are detected by the ping of `heartbeat` seconds.
+    """
+    def __init__(self, max_results: int = 16, heartbeat: float = 10.0):
+        self.max_results = max_results
+        self.heartbeat = heartbeat
+        self.handlers: Dict[str, Callable[..., Awaitable[Any]]] = dict()
+        self.sockets: Dict[str, web.WebSocketResponse] = dict()
+        self._outboxes: Dict[str, _Outbox] = dict()
+        self._drop_handler: Optional[Callable[[str], None]] = None
+
+    def on(self, event: str, handler: Callable[..., Awaitable[Any]]):
+        self.handlers[event] = handler
+
+    def on_drop(self, handler: Callable[[str], None]):
+        """Set the callback with the session ID whose results are dropped.
+        """
+        self._drop_handler = handler
+
+    def _dropped(self, sid: str):
+        if self._drop_handler is not None:
+            self._drop_handler(sid)
+
+    async def emit(
+        self,
+        event: str,
+        data: PortableType = None,
+        room: str = None,
+    ):
+        ws = self.sockets.get(room)
+        outbox = self._outboxes.get(room)
+        if ws is None or ws.closed or outbox is None:
+            return
+        outbox.put(event, pack_message(event, [data]))
+
+    async def disconnect(self, sid: str):
+        outbox = self._outboxes.get(sid)
+        if outbox is not None:
+            # after the messages emitted before (e.g. `internal_error`)
+            outbox.close()
+
+    async def handle(self, request: web.Request):
+        ws = web.WebSocketResponse(heartbeat=self.heartbeat)
+        await ws.prepare(request)
+
+        sid = 'ws-{}'.format(uuid.uuid4().hex)
+        outbox = _Outbox(ws, self.max_results, lambda: self._dropped(sid))
+        sender = asyncio.get_event_loop().create_task(outbox.run())
+        self.sockets[sid] = ws
+        self._outboxes[sid] = outbox
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.BINARY:
+                    continue
+                try:
+                    event, args = unpack_message(message.data)
+                except Exception:
+                    traceback.print_exc()
+                    continue
+                handler = self.handlers.get(event)
+                if handler is not None:
+                    await handler(sid, *args)
+        finally:
+            self.sockets.pop(sid, None)
+            self._outboxes.pop(sid, None)
+            sender.cancel()
+            handler = self.handlers.get('disconnect')
+            if handler is not None:
+                await handler(sid)
+
+        return ws
@@ -0,0 +1,7 @@
+from .core import StaticFiles, PageCache
+
+
+__all__ = [
+    'StaticFiles',
+    'PageCache',
+]
@@ -0,0 +1,332 @@
+from aiohttp import web
+from aiohttp_jinja2 import render_string, get_env
+import jinja2
+import jinja2.meta
+
+import os
+import json
+import hashlib
+import mimetypes
+import collections
+
+from typing import Optional, Any, Mapping, Tuple, List, Dict, Set
+from typing import OrderedDict
+
+
+# for the content-hashed files and the URLs with a version query
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# the other responses are always revalidated with the ETag
+REVALIDATE = 'no-cache'
+# the precompressed variants in the order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(header: str) -> Set[str]:
+    """Parse the Accept-Encoding header (the encodings of q=0 are omitted).
+    """
+    encodings = set()
+    for item in header.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name and 0.0 < q:
+            encodings.add(name)
+    return encodings
+
+
+def etag_matches(request: web.Request, etag: str) -> bool:
+    header = request.headers.get('If-None-Match', '')
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in tags or 'W/' + etag in tags
+
+
+def not_modified(etag: str, cache_control: str) -> web.Response:
+    return web.Response(
+        status=304,
+        headers={'ETag': etag, 'Cache-Control': cache_control},
+    )
+
+
+class _Entry:
+    def __init__(self, path: str):
+        stat = os.stat(path)
+        self.key = (stat.st_mtime_ns, stat.st_size)
+        with open(path, 'rb') as f:
+            self.body = f.read()
+        self.digest = hashlib.sha1(self.body).hexdigest()[:16]
+
+
+class StaticFiles:
+    """Static files served from memory with ETags and cache headers.
+
+    The precompressed variants (`<file>.br` and `<file>.gz`) built by
+    webpack are served by content negotiation. The files listed in the
+    manifest of webpack (`{"bundle.js": "bundle.<hash>.js"}`) and the URLs
+    made by `url` (with `?v=<hash>`) are cached by the browsers forever.
+    The least recently used files are evicted from the memory
+    when the cached files exceed `max_cache_size` bytes.
+    """
+    def __init__(
+        self,
+        directories: Dict[str, str],
+        manifest_path: Optional[str] = None,
+        max_cache_size: int = 64 * 1024 * 1024,
+    ):
+        self.directories = {
+            prefix.rstrip('/'): os.path.abspath(directory)
+            for prefix, directory in directories.items()
+        }
+        self.manifest_path = manifest_path
+        self.max_cache_size = max_cache_size
+        self._manifest_key = None
+        self._manifest: Dict[str, str] = {}
+        self._entries: OrderedDict[str, _Entry] = collections.OrderedDict()
+        self._cache_size = 0
+
+    def add_routes(self, routes: web.RouteTableDef):
+        for prefix in self.directories:
+            routes.get(prefix + '/{filename:.+}')(self.handle)
+
+    def resolve(self, url_path: str) -> Optional[str]:
+        """Map a URL path into an existing file (None if not found).
+        """
+        for prefix, directory in self.directories.items():
+            if not url_path.startswith(prefix + '/'):
+                continue
+            filename = url_path[len(prefix) + 1:]
+            path = os.path.abspath(os.path.join(directory, filename))
+            # refuse the paths out of the directory (e.g. '../app.py')
+            if os.path.commonpath([directory, path]) != directory:
+                return None
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def manifest(self) -> Dict[str, str]:
+        """The manifest reloaded when the bundle is rebuilt.
+        """
+        if self.manifest_path is None:
+            return {}
+        try:
+            stat = os.stat(self.manifest_path)
+        except OSError:
+            self._manifest_key = None
+            self._manifest = {}
+            return self._manifest
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key != self._manifest_key:
+            with open(self.manifest_path, encoding='utf-8') as f:
+                self._manifest = json.load(f)
+            self._manifest_key = key
+        return self._manifest
+
+    def entry(self, path: str) -> _Entry:
+        """Load a file unless the cached one is up to date.
+        """
+        entry = self._entries.get(path)
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        if entry is not None and entry.key == key:
+            self._entries.move_to_end(path)
+            return entry
+
+        if entry is not None:
+            self._cache_size -= len(self._entries.pop(path).body)
+        entry = _Entry(path)
+        self._entries[path] = entry
+        self._cache_size += len(entry.body)
+        # keep the new entry even if it exceeds the limit by itself
+        while (
+            self.max_cache_size < self._cache_size
+            and 1 < len(self._entries)
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._cache_size -= len(evicted.body)
+        return entry
+
+    def url(self, url_path: str) -> str:
+        """Make the cache-busting URL of a static file.
+
+        e.g. `/dist/bundle.js` into `/dist/bundle.<hash>.js`
+        and `/analyzers/stft/script.js` into `...script.js?v=<hash>`.
+        """
+        directory, _, name = url_path.rpartition('/')
+        hashed_name = self.manifest().get(name)
+        if hashed_name is not None:
+            hashed_path = '{}/{}'.format(directory, hashed_name)
+            if self.resolve(hashed_path) is not None:
+                return hashed_path
+        path = self.resolve(url_path)
+        if path is None:
+            return url_path
+        return '{}?v={}'.format(url_path, self.entry(path).digest)
+
+    def is_immutable(self, request: web.Request, path: str) -> bool:
+        # the outdated versions are revalidated instead
+        if 'v' in request.query:
+            return request.query['v'] == self.entry(path).digest
+        return os.path.basename(path) in self.manifest().values()
+
+    async def handle(self, request: web.Request):
+        path = self.resolve(request.path)
+        if path is None:
+            raise web.HTTPNotFound()
+
+        encoding = None
+        entry = self.entry(path)
+        accepted = accepted_encodings(
+            request.headers.get('Accept-Encoding', ''),
+        )
+        for name, suffix in ENCODINGS:
+            if name not in accepted or not os.path.isfile(path + suffix):
+                continue
+            variant = self.entry(path + suffix)
+            # ignore the stale variants of an edited file
+            if entry.key[0] <= variant.key[0]:
+                encoding, entry = name, variant
+                break
+
+        if self.is_immutable(request, path):
+            cache_control = IMMUTABLE
+        else:
+            cache_control = REVALIDATE
+        etag = '"{}"'.format(
+            entry.digest if encoding is None else entry.digest + '-' + encoding
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag, cache_control)
+
+        content_type, _ = mimetypes.guess_type(path)
+        headers = {
+            'ETag': etag,
+            'Cache-Control': cache_control,
+            'Vary': 'Accept-Encoding',
+        }
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+        return web.Response(
+            body=entry.body,
+            content_type=content_type or 'application/octet-stream',
+            headers=headers,
+        )
+
+
+def referenced_templates(
+    env: jinja2.Environment,
+    name: str,
+) -> List[jinja2.Template]:
+    """The template and those it extends, includes or imports.
+
+    The dynamic references (e.g. `{% include name %}`) are not followed.
+    """
+    templates = []
+    names = [name]
+    seen = set()
+    while names:
+        name = names.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        templates.append(env.get_template(name))
+        source, _, _ = env.loader.get_source(env, name)
+        names.extend(
+            reference
+            for reference in jinja2.meta.find_referenced_templates(
+                env.parse(source),
+            )
+            if reference is not None
+        )
+    return templates
+
+
+class _Page:
+    def __init__(
+        self,
+        text: str,
+        templates: List[jinja2.Template],
+        urls: Dict[str, str],
+    ):
+        self.text = text
+        self.etag = '"{}"'.format(
+            hashlib.sha1(text.encode('utf-8')).hexdigest()[:16],
+        )
+        self.templates = templates
+        self.urls = urls
+
+
+class PageCache:
+    """Rendered pages cached while they are up to date.
+
+    A page is rendered again when a template it is made from changes
+    (checked by Jinja with the modification times of the files)
+    or when a URL made by `asset_url` in it changes
+    (e.g. the bundle rebuilt or the script of an analyzer edited).
+    """
+    def __init__(self, static_files: StaticFiles):
+        self.static_files = static_files
+        self._pages: Dict[Tuple, _Page] = {}
+
+    def is_up_to_date(self, page: _Page) -> bool:
+        return (
+            all(template.is_up_to_date for template in page.templates)
+            and all(
+                self.static_files.url(url_path) == url
+                for url_path, url in page.urls.items()
+            )
+        )
+
+    def get(
+        self,
+        request: web.Request,
+        key: Tuple,
+        template_name: str,
+        context: Mapping[str, Any],
+    ) -> _Page:
+        """Return the page rendering it if necessary.
+        """
+        page = self._pages.get(key)
+        if page is not None and self.is_up_to_date(page):
+            return page
+
+        urls: Dict[str, str] = {}
+
+        def asset_url(url_path: str) -> str:
+            urls[url_path] = self.static_files.url(url_path)
+            return urls[url_path]
+
+        # the templates are listed first not to miss a change while rendering
+        templates = referenced_templates(get_env(request.app), template_name)
+        text = render_string(
+            template_name,
+            request=request,
+            context=dict(context, asset_url=asset_url),
+        )
+        page = _Page(text, templates, urls)
+        self._pages[key] = page
+        return page
+
+    def respond(
+        self,
+        request: web.Request,
+        key: Tuple,
+        template_name: str,
+        context: Mapping[str, Any],
+    ) -> web.Response:
+        page = self.get(request, key, template_name, context)
+        text, etag = page.text, page.etag
+        if etag_matches(request, etag):
+            return not_modified(etag, REVALIDATE)
+        response = web.Response(
+            text=text,
+            content_type='text/html',
+            headers={'ETag': etag, 'Cache-Control': REVALIDATE},
+        )
+        response.enable_compression()
+        return response
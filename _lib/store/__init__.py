@@ -0,0 +1,8 @@
+from .core import ResultStore, TIERS, series_prefix
+
+
+__all__ = [
+    'ResultStore',
+    'TIERS',
+    'series_prefix',
+]
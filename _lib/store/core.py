@@ -0,0 +1,394 @@
+import numpy as np
+
+import time
+import queue
+import sqlite3
+import threading
+
+from _lib.util import ConvertibleType
+
+from typing import Optional, Tuple, List, Dict, Any
+
+
+# the interval of the rows in seconds (0 means the raw results)
+TIERS = (0.0, 1.0, 10.0, 60.0)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS samples (
+    series INTEGER NOT NULL,
+    tier REAL NOT NULL,
+    time REAL NOT NULL,
+    count INTEGER NOT NULL,
+    mean BLOB NOT NULL,
+    max BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_index ON samples (series, tier, time);
+"""
+RANGE_CONDITION = ' WHERE series = ? AND tier = ? AND ? <= time AND time < ?'
+
+
+def flatten_results(
+    results: ConvertibleType,
+    prefix: str = '',
+) -> List[Tuple[str, np.ndarray]]:
+    """List the numeric values of results as float32 arrays with the paths.
+
+    e.g. `{'spectrum': [a, b]}` is flattened into
+    `[('spectrum/0', a), ('spectrum/1', b)]`.
+    """
+    if isinstance(results, dict):
+        items = results.items()
+    elif isinstance(results, (tuple, list)):
+        items = enumerate(results)
+    elif isinstance(results, np.ndarray):
+        if results.ndim != 1 or results.dtype.kind not in 'biuf':
+            return []
+        return [(prefix, results.astype(np.float32))]
+    elif isinstance(results, (int, float, np.number)):
+        return [(prefix, np.array([results], dtype=np.float32))]
+    else:
+        return []
+
+    flattened = []
+    for key, value in items:
+        path = '{}/{}'.format(prefix, key) if prefix else str(key)
+        flattened.extend(flatten_results(value, path))
+    return flattened
+
+
+class _Rollup:
+    """Accumulator of the mean and the maximum in a tier interval."""
+    def __init__(self, start: float, value: np.ndarray):
+        self.start = start
+        self.count = 1
+        self.sum = value.astype(np.float64)
+        self.max = value.copy()
+
+    def add(self, value: np.ndarray):
+        self.count += 1
+        self.sum += value
+        np.maximum(self.max, value, out=self.max)
+
+    def row(self, series_id: int, tier: float):
+        mean = (self.sum / self.count).astype(np.float32)
+        return (
+            series_id, tier, self.start, self.count,
+            mean.tobytes(), self.max.tobytes(),
+        )
+
+
+def series_prefix(analyzer_name: str, source: str, window_size: int):
+    """The prefix of the series of a session, e.g. `stft/local/2048`.
+
+    The results of the different sources and window sizes are not mixed.
+    """
+    return '{}/{}/{}'.format(analyzer_name, source, window_size)
+
+
+def merge_rows(
+    time: np.ndarray,
+    count: np.ndarray,
+    mean: np.ndarray,
+    maximum: np.ndarray,
+    starts: np.ndarray,
+):
+    """Merge the consecutive rows from each of `starts` (row indices).
+
+    `mean` and `maximum` have the shape (rows, length). The merged rows
+    have the time of their first row and the mean weighted by the counts.
+    """
+    counts = np.add.reduceat(count, starts)
+    weighted = np.add.reduceat(
+        mean * count[:, np.newaxis].astype(np.float64),
+        starts,
+    )
+    return (
+        time[starts],
+        counts,
+        (weighted / counts[:, np.newaxis]).astype(np.float32),
+        np.maximum.reduceat(maximum, starts),
+    )
+
+
+def downsample(
+    time: np.ndarray,
+    count: np.ndarray,
+    mean: np.ndarray,
+    maximum: np.ndarray,
+    n_points: int,
+):
+    """Merge the consecutive rows into `n_points` rows.
+    """
+    starts = np.linspace(0, len(time), n_points + 1).astype(int)[:-1]
+    return merge_rows(time, count, mean, maximum, np.unique(starts))
+
+
+class ResultStore:
+    """Local time-series store of analyzer results in SQLite.
+
+    `put` only copies the numeric results into float32 arrays and
+    enqueues them; a writer thread inserts them in batches together with
+    the rollups (mean/max per 1 s, 10 s and 1 min).
+    The raw results older than `raw_retention` seconds are deleted.
+    The series are named `<prefix>/<path in the results>`
+    (see `series_prefix`), and the sessions of the same series
+    are accumulated into the same rollups.
+    """
+    def __init__(
+        self,
+        path: str,
+        raw_retention: float = 600.0,
+        max_queue: int = 4096,
+    ):
+        self.path = path
+        self.raw_retention = raw_retention
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(max_queue)
+        self._thread = threading.Thread(
+            target=self._run,
+            name='result-store',
+            daemon=True,
+        )
+        self._series: Dict[str, int] = dict()
+        # by the series name and the tier
+        self._rollups: Dict[Tuple[str, float], _Rollup] = dict()
+
+    def start(self):
+        self._thread.start()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def put(
+        self,
+        prefix: str,
+        results: ConvertibleType,
+        timestamp: Optional[float] = None,
+    ):
+        """Enqueue results without blocking (dropped when the queue is full).
+
+        The arrays are copied here because the analyzers may reuse them
+        (e.g. the envelope of `waveform`) while the writer reads them.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        try:
+            self._queue.put_nowait((
+                timestamp,
+                flatten_results(results, prefix),
+            ))
+        except queue.Full:
+            self.dropped += 1
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _series_id(self, connection: sqlite3.Connection, name: str):
+        if name not in self._series:
+            connection.execute(
+                'INSERT OR IGNORE INTO series (name) VALUES (?)',
+                (name,),
+            )
+            (series_id,), = connection.execute(
+                'SELECT id FROM series WHERE name = ?',
+                (name,),
+            )
+            self._series[name] = series_id
+        return self._series[name]
+
+    def _rows(self, connection: sqlite3.Connection, item: Tuple[Any, ...]):
+        timestamp, flattened = item
+        rows = []
+        for name, value in flattened:
+            series_id = self._series_id(connection, name)
+            # the maximum of a raw result is the result itself
+            rows.append((
+                series_id, TIERS[0], timestamp, 1, value.tobytes(), b'',
+            ))
+
+            for tier in TIERS[1:]:
+                start = timestamp - timestamp % tier
+                key = (name, tier)
+                rollup = self._rollups.get(key)
+                if (
+                    rollup is not None
+                    and rollup.start == start
+                    and rollup.max.shape == value.shape
+                ):
+                    rollup.add(value)
+                    continue
+                if rollup is not None:
+                    rows.append(rollup.row(series_id, tier))
+                self._rollups[key] = _Rollup(start, value)
+        return rows
+
+    def _flush_rollups(
+        self,
+        connection: sqlite3.Connection,
+        until: Optional[float] = None,
+    ):
+        """Write the rollups whose intervals end by `until` (all if None),
+        e.g. those of the series no longer analyzed.
+        """
+        rows = []
+        for key, rollup in list(self._rollups.items()):
+            name, tier = key
+            if until is None or rollup.start + tier <= until:
+                series_id = self._series_id(connection, name)
+                rows.append(rollup.row(series_id, tier))
+                del self._rollups[key]
+        return rows
+
+    def _insert(self, connection: sqlite3.Connection, rows):
+        with connection:
+            connection.executemany(
+                'INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?)',
+                rows,
+            )
+
+    def _get_items(self, max_items: int = 256) -> List[Any]:
+        """Wait for the queued items (ending with None when closed).
+        """
+        items = [self._queue.get()]
+        while items[-1] is not None and len(items) < max_items:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _write(self, connection: sqlite3.Connection, items: List[Any]):
+        """Write the items and the completed rollups in a transaction.
+        """
+        rows = []
+        results = [item for item in items if item is not None]
+        for item in results:
+            rows.extend(self._rows(connection, item))
+        if items[-1] is None:
+            rows.extend(self._flush_rollups(connection))
+        elif results:
+            latest = max(item[0] for item in results)
+            rows.extend(self._flush_rollups(connection, latest))
+        self._insert(connection, rows)
+
+    def _purge(self, connection: sqlite3.Connection, now: float):
+        with connection:
+            connection.execute(
+                'DELETE FROM samples WHERE tier = ? AND time < ?',
+                (TIERS[0], now - self.raw_retention),
+            )
+
+    def _run(self):
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        last_purge = time.time()
+        try:
+            while True:
+                items = self._get_items()
+                self._write(connection, items)
+                if items[-1] is None:
+                    break
+
+                now = time.time()
+                if 10.0 <= now - last_purge:
+                    last_purge = now
+                    self._purge(connection, now)
+        finally:
+            connection.close()
+
+    def list_series(self):
+        """Names of the series with their first and last time.
+        """
+        connection = self._connect()
+        try:
+            return [
+                {'name': name, 'start': start, 'end': end}
+                for name, start, end in connection.execute(
+                    'SELECT series.name, MIN(samples.time), MAX(samples.time)'
+                    ' FROM series JOIN samples ON series.id = samples.series'
+                    ' GROUP BY series.id ORDER BY series.name'
+                )
+            ]
+        finally:
+            connection.close()
+
+    def query(
+        self,
+        name: str,
+        start: float,
+        end: float,
+        max_points: int = 2000,
+    ):
+        """Rows of a series in [start, end) from the finest tier
+        that has at most `max_points` rows in the range.
+
+        The rows of the same time (e.g. the partial rollups written when
+        the length of the results changed) are merged, and when even the
+        coarsest tier has more rows, they are merged into `max_points`
+        rows (see `downsample`).
+        The result has the 1D arrays `time`, `count`, and `mean` and `max`
+        which are concatenated rows of `length` elements.
+        """
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                'SELECT id FROM series WHERE name = ?',
+                (name,),
+            ).fetchone()
+            if row is None:
+                raise KeyError(name)
+            series_id, = row
+
+            for tier in TIERS:
+                (count,), = connection.execute(
+                    'SELECT COUNT(*) FROM samples' + RANGE_CONDITION,
+                    (series_id, tier, start, end),
+                )
+                # the raw results may be deleted already
+                if 0 < count <= max_points:
+                    break
+
+            rows = connection.execute(
+                'SELECT time, count, mean, max FROM samples'
+                + RANGE_CONDITION + ' ORDER BY time, rowid',
+                (series_id, tier, start, end),
+            ).fetchall()
+        finally:
+            connection.close()
+
+        # keep the rows of the latest length only
+        length = len(rows[-1][2]) // 4 if rows else 0
+        rows = [row for row in rows if len(row[2]) // 4 == length]
+        times = np.array([row[0] for row in rows], dtype=np.float64)
+        counts = np.array([row[1] for row in rows], dtype=np.uint32)
+        means = np.frombuffer(
+            b''.join(row[2] for row in rows), dtype=np.float32,
+        ).reshape(len(rows), length)
+        maxima = np.frombuffer(
+            b''.join(row[3] or row[2] for row in rows), dtype=np.float32,
+        ).reshape(len(rows), length)
+        if rows:
+            _, starts = np.unique(times, return_index=True)
+            times, counts, means, maxima = merge_rows(
+                times, counts, means, maxima, starts,
+            )
+        if max_points < len(times):
+            times, counts, means, maxima = downsample(
+                times, counts, means, maxima, max(1, max_points),
+            )
+        return {
+            'tier': tier,
+            'length': length,
+            'time': times,
+            'count': counts.astype(np.uint32),
+            'mean': means.ravel(),
+            'max': maxima.ravel(),
+        }
@@ -3,7 +3,10 @@ from .convert import (
     PortableType,
     numpy_to_bytes,
     bytes_to_numpy,
+    cast_floating,
 )
+from .delta import DeltaEncoder
+from .packet import pack_message, unpack_message
 from .submodule import list_submodules
 
 
@@ -12,6 +15,11 @@ __all__ = [
     'PortableType',
     'numpy_to_bytes',
     'bytes_to_numpy',
+    'cast_floating',
+
+    'DeltaEncoder',
+    'pack_message',
+    'unpack_message',
 
     'list_submodules',
 ]
@@ -60,7 +60,8 @@ def numpy_to_bytes(data: ConvertibleType) -> PortableType:
                 "Multi-dimensional numpy array is not convertible."
             )
         jstype = DTYPE_JSTYPE_MAP[data.dtype]
-        data = data.astype(data.dtype.newbyteorder('>'))
+        # little endian, the byte order of almost all clients
+        data = data.astype(data.dtype.newbyteorder('<'))
         return {
             '_dtype': jstype,
             '_buffer': data.tobytes(),
@@ -71,6 +72,29 @@ def numpy_to_bytes(data: ConvertibleType) -> PortableType:
         return data.item()
 
 
+def cast_floating(data: ConvertibleType, dtype: np.dtype):
+    """Cast contained floating point numpy arrays into dtype.
+
+    Return the cast data and the set of the floating point dtypes
+    wider than dtype found in data (accidental upcasts).
+    """
+    upcasts = set()
+
+    def cast(data: ConvertibleType):
+        if isinstance(data, dict):
+            return {key: cast(value) for key, value in data.items()}
+        elif isinstance(data, (tuple, list)):
+            return type(data)(cast(value) for value in data)
+        elif isinstance(data, np.ndarray) and data.dtype.kind == 'f':
+            if dtype.itemsize < data.dtype.itemsize:
+                upcasts.add(data.dtype)
+            return data.astype(dtype, copy=False)
+        else:
+            return data
+
+    return cast(data), upcasts
+
+
 def bytes_to_numpy(data: PortableType) -> ConvertibleType:
     """Convert contained data-type info and bytes to numpy array.
     """
@@ -79,7 +103,7 @@ def bytes_to_numpy(data: PortableType) -> ConvertibleType:
             dtype = JSTYPE_DTYPE_MAP[data['_dtype']]
             data = np.frombuffer(
                 data['_buffer'],
-                dtype=dtype.newbyteorder('>'),
+                dtype=dtype.newbyteorder('<'),
             )
             data = data.astype(dtype)
             return data
@@ -0,0 +1,90 @@
+import numpy as np
+
+from .convert import (
+    ConvertibleType,
+    PortableType,
+    DTYPE_JSTYPE_MAP,
+    numpy_to_bytes,
+)
+
+from typing import Tuple, Dict
+
+
+class DeltaEncoder:
+    """Convert results into the delta from the results sent previously.
+
+    Each 1D numpy array is compared with the last array sent at the same
+    position (e.g. `('spectrum', 0)`) and converted into one of
+
+    - `{'_dtype': ..., '_same': True}` when no element is changed,
+    - `{'_dtype': ..., '_indices': ..., '_buffer': ...}` which has the
+      changed elements only, when it is smaller than the whole array,
+    - `{'_dtype': ..., '_buffer': ...}` (same as `numpy_to_bytes`).
+
+    An element is regarded as changed when it differs from the value
+    the client holds by more than `threshold`.
+    """
+    def __init__(self, threshold: float = 0.0):
+        self.threshold = threshold
+        self._last: Dict[Tuple, np.ndarray] = dict()
+
+    def reset(self):
+        self._last.clear()
+
+    def encode(self, data: ConvertibleType, path: Tuple = ()) -> PortableType:
+        if isinstance(data, dict):
+            if '_dtype' in data:
+                raise ValueError("'_dtype' is an illegal key.")
+
+            return {
+                key: self.encode(value, path + (key,))
+                for key, value in data.items()
+            }
+        elif isinstance(data, (tuple, list)):
+            return type(data)(
+                self.encode(value, path + (index,))
+                for index, value in enumerate(data)
+            )
+        elif isinstance(data, np.ndarray):
+            return self._encode_array(data, path)
+        else:
+            return numpy_to_bytes(data)
+
+    def _encode_array(self, data: np.ndarray, path: Tuple) -> PortableType:
+        last = self._last.get(path)
+        if (
+            last is None
+            or last.shape != data.shape
+            or last.dtype != data.dtype
+        ):
+            portable = numpy_to_bytes(data)
+            self._last[path] = data.copy()
+            return portable
+
+        if 0.0 < self.threshold and data.dtype.kind == 'f':
+            # NaN is always regarded as changed
+            changed = ~(np.abs(data - last) <= self.threshold)
+        else:
+            changed = data != last
+        n_changed = np.count_nonzero(changed)
+        jstype = DTYPE_JSTYPE_MAP[data.dtype]
+
+        if n_changed == 0:
+            return {
+                '_dtype': jstype,
+                '_same': True,
+            }
+
+        index_size = np.dtype(np.uint32).itemsize
+        if n_changed * (index_size + data.itemsize) < data.nbytes:
+            indices = np.flatnonzero(changed).astype(np.uint32)
+            values = data[indices]
+            last[indices] = values
+            return {
+                '_dtype': jstype,
+                '_indices': numpy_to_bytes(indices)['_buffer'],
+                '_buffer': numpy_to_bytes(values)['_buffer'],
+            }
+
+        last[...] = data
+        return numpy_to_bytes(data)
@@ -0,0 +1,81 @@
+import json
+import struct
+
+from .convert import PortableType
+
+from typing import Any, Tuple, List
+
+
+PACKET_VERSION = 1
+# version (uint8), reserved (3 bytes), JSON length (uint32, big endian)
+HEADER_FORMAT = '>B3xI'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+ALIGNMENT = 8
+
+
+def _padding(length: int):
+    return -length % ALIGNMENT
+
+
+def pack_message(event: str, args: List[PortableType]) -> bytes:
+    """Pack an event and its arguments into a single binary message.
+
+    The message consists of the header, the JSON of `{event, args}` and
+    the attachments. Each bytes object in the arguments is moved to the
+    attachments and replaced with `{'_attachment': [offset, length]}`,
+    where the offset is relative to the start of the attachments.
+    All parts are aligned to 8 bytes.
+    """
+    attachments: List[bytes] = []
+    offset = 0
+
+    def default(value: Any):
+        nonlocal offset
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            value = bytes(value)
+            placeholder = {'_attachment': [offset, len(value)]}
+            attachments.append(value)
+            attachments.append(b'\0' * _padding(len(value)))
+            offset += len(value) + _padding(len(value))
+            return placeholder
+        raise TypeError(
+            'Object of type {} is not packable.'.format(type(value).__name__)
+        )
+
+    body = json.dumps(
+        {'event': event, 'args': args},
+        default=default,
+        separators=(',', ':'),
+    ).encode('utf-8')
+    header = struct.pack(HEADER_FORMAT, PACKET_VERSION, len(body))
+    return b''.join([
+        header,
+        body,
+        b'\0' * _padding(HEADER_SIZE + len(body)),
+        *attachments,
+    ])
+
+
+def unpack_message(message: bytes) -> Tuple[str, List[PortableType]]:
+    """Unpack a binary message packed by `pack_message`.
+    """
+    version, length = struct.unpack_from(HEADER_FORMAT, message)
+    if version != PACKET_VERSION:
+        raise ValueError('Unknown packet version {}.'.format(version))
+
+    body_end = HEADER_SIZE + length
+    attachments_start = body_end + _padding(body_end)
+    view = memoryview(message)
+
+    def object_hook(value: dict):
+        if '_attachment' in value:
+            offset, size = value['_attachment']
+            start = attachments_start + offset
+            return bytes(view[start:start + size])
+        return value
+
+    data = json.loads(
+        bytes(view[HEADER_SIZE:body_end]).decode('utf-8'),
+        object_hook=object_hook,
+    )
+    return data['event'], data['args']
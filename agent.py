@@ -0,0 +1,82 @@
+import sys
+import asyncio
+
+from app import define_input_parser, validate_input_args, print_input_devices
+
+from argparse import ArgumentParser, Namespace, ArgumentDefaultsHelpFormatter
+
+from typing import Optional, Sequence
+
+
+class CaptureAgentRoutine:
+    def define_parser(self, parser: ArgumentParser):
+        parser.add_argument(
+            '--server', type=str,
+            default='ws://localhost:8080/agent',
+            help='URL of the agent endpoint of the analyzer server',
+        )
+        parser.add_argument(
+            '--name', type=str,
+            default='agent',
+            help='name of the agent chosen by the analysis sessions',
+        )
+        define_input_parser(parser)
+        parser.add_argument(
+            '--block-size', type=int,
+            default=512,
+            help='the number of samples in a block sent to the server',
+        )
+        parser.add_argument(
+            '--compress', action='store_true',
+            help='compress the blocks with zlib',
+        )
+
+    def setup(self, args: Namespace):
+        self.server: str = args.server
+        self.name: str = args.name
+        self.sample_rate: float = args.sample_rate
+        self.channels: int = args.channels
+        self.device: int = args.device
+        self.show_devices: bool = args.show_devices
+        self.block_size: int = args.block_size
+        self.compress: bool = args.compress
+
+    def main(self):
+        if self.show_devices:
+            print_input_devices()
+            return
+
+        from _lib.coroutine.agent import capture_agent_main
+
+        print('Stream to {} as {!r}.'.format(self.server, self.name))
+        print('Press Ctrl+C to quit.')
+        try:
+            asyncio.run(
+                capture_agent_main(
+                    url=self.server,
+                    name=self.name,
+                    sample_rate=self.sample_rate,
+                    channels=self.channels,
+                    device=self.device,
+                    block_size=self.block_size,
+                    compress=self.compress,
+                )
+            )
+        except KeyboardInterrupt:
+            pass
+
+    def run(self, command_line_args: Optional[Sequence[str]] = None):
+        parser = ArgumentParser(
+            prog=sys.argv[0],
+            formatter_class=ArgumentDefaultsHelpFormatter,
+        )
+        self.define_parser(parser)
+        args = parser.parse_args(command_line_args)
+        validate_input_args(parser, args)
+
+        self.setup(args)
+        self.main()
+
+
+if __name__ == '__main__':
+    CaptureAgentRoutine().run()
@@ -0,0 +1,69 @@
+import numpy as np
+import scipy as sp
+import scipy.signal
+
+from _lib.analyzer import BaseAnalyzer, group, field, filterbank
+
+
+class Analyzer (BaseAnalyzer):
+    # receive signals of the shape (channels, window_size)
+    channel_major = True
+    # the spectra of the channels are analyzed separately
+    # (split into groups of channels with --analysis-workers)
+    channel_independent = True
+    channel_results = ('spectrum',)
+
+    # the sample rate of input signals
+    sample_rate = field.float_('Sample rate')
+    # the number of channels
+    channels = field.int_('Channels')
+    # the length of input signals
+    window_size = field.int_('Window size')
+    # the length of the interval between signal clippings
+    frame_step = field.int_('Frame step')
+
+    group('Chroma')
+    # the number of chroma bins per octave
+    n_chroma = field.int_('Chroma bins', default=12, min=1)
+    # whether to normalize each chromagram by its maximum or not
+    normalize = field.bool_('Normalize', default=True)
+
+    @n_chroma.validate
+    def validate_n_chroma(self, value: int):
+        return 0 < value
+
+    @window_size.compute
+    def update_window(self):
+        self.window = sp.signal.get_window(
+            'hann', self.window_size,
+        ).astype(self.dtype)
+
+    # the filterbank is shared among the analyzers of the same configuration
+    @sample_rate.compute
+    @window_size.compute
+    @n_chroma.compute
+    def update_filterbank(self):
+        self.filterbank = filterbank.chroma(
+            self.sample_rate,
+            self.window_size,
+            self.n_chroma,
+            dtype=self.dtype,
+        )
+
+    def __init__(self):
+        self.update_window()
+        self.update_filterbank()
+
+    def analyze(self, signal: np.ndarray):
+        # (channels, frequencies)
+        spectrum = filterbank.power_spectrum(signal, self.window)
+        # (channels, chroma bins) by a single sparse matrix product
+        chromagram = self.filterbank.apply(spectrum)
+
+        if self.normalize:
+            peaks = chromagram.max(axis=-1, keepdims=True)
+            chromagram /= np.maximum(peaks, np.finfo(chromagram.dtype).tiny)
+
+        return {
+            'spectrum': list(chromagram),
+        }
@@ -0,0 +1,84 @@
+import numpy as np
+
+from _lib.analyzer import BaseAnalyzer, group, field, filterbank
+
+
+class Analyzer (BaseAnalyzer):
+    # receive signals of the shape (channels, window_size)
+    channel_major = True
+    # the spectra of the channels are analyzed separately
+    # (split into groups of channels with --analysis-workers)
+    channel_independent = True
+    channel_results = ('spectrum',)
+    # the sparser kernels are used when it is overloaded
+    quality_levels = 3
+    # the thresholds of the kernel coefficients by the quality level
+    kernel_thresholds = (0.0054, 0.05, 0.2)
+
+    # the sample rate of input signals
+    sample_rate = field.float_('Sample rate')
+    # the number of channels
+    channels = field.int_('Channels')
+    # the length of input signals
+    window_size = field.int_('Window size')
+    # the length of the interval between signal clippings
+    frame_step = field.int_('Frame step')
+
+    group('Constant Q')
+    # the number of frequency bins
+    n_bins = field.int_('Bins', default=84, min=1)
+    # the number of frequency bins per octave
+    bins_per_octave = field.int_('Bins per octave', default=12, min=1)
+    # the lowest frequency (C1 by default)
+    fmin = field.float_('Min frequency', default=32.70, min=0.0)
+
+    group('Scaling')
+    # the scale of a spectrum
+    scale = field.float_(default=1.0, step=1.0)
+    # whether to scale a spectrum or not
+    use_scale = field.bool_(default=False)
+
+    @n_bins.validate
+    @bins_per_octave.validate
+    @fmin.validate
+    def validate_positive(self, value):
+        return 0 < value
+
+    # the kernel is shared among the analyzers of the same configuration
+    @sample_rate.compute
+    @window_size.compute
+    @n_bins.compute
+    @bins_per_octave.compute
+    @fmin.compute
+    def update_filterbank(self):
+        self.filterbank = self.get_filterbank(0)
+
+    def get_filterbank(self, quality: int):
+        return filterbank.cqt(
+            self.sample_rate,
+            self.window_size,
+            self.n_bins,
+            self.fmin,
+            self.bins_per_octave,
+            self.kernel_thresholds[quality],
+            dtype=self.dtype,
+        )
+
+    def __init__(self):
+        self.update_filterbank()
+
+    def analyze(self, signal: np.ndarray):
+        # (channels, frequencies); the kernels are windowed by themselves
+        spectrum = filterbank.complex_spectrum(signal)
+        # (channels, bins) by a single sparse matrix product
+        bank = self.filterbank
+        if 0 < self.quality:
+            bank = self.get_filterbank(self.quality)
+        cq_spectrum = np.abs(bank.apply(spectrum)) ** 2
+
+        if self.use_scale:
+            cq_spectrum *= self.scale
+
+        return {
+            'spectrum': list(cq_spectrum),
+        }
@@ -0,0 +1,93 @@
+import numpy as np
+import scipy as sp
+import scipy.signal
+
+from _lib.analyzer import BaseAnalyzer, group, field, filterbank
+
+
+class Analyzer (BaseAnalyzer):
+    # receive signals of the shape (channels, window_size)
+    channel_major = True
+    # the spectra of the channels are analyzed separately
+    # (split into groups of channels with --analysis-workers)
+    channel_independent = True
+    channel_results = ('spectrum',)
+
+    # the sample rate of input signals
+    sample_rate = field.float_('Sample rate')
+    # the number of channels
+    channels = field.int_('Channels')
+    # the length of input signals
+    window_size = field.int_('Window size')
+    # the length of the interval between signal clippings
+    frame_step = field.int_('Frame step')
+
+    group('Mel')
+    # the number of mel bands
+    n_mels = field.int_('Mel bands', default=128, min=1)
+    # the lowest frequency of the mel bands
+    fmin = field.float_('Min frequency', default=0.0, min=0.0)
+    # the highest frequency of the mel bands (0 means the Nyquist frequency)
+    fmax = field.float_('Max frequency', default=0.0, min=0.0)
+
+    group('Scaling')
+    # the scale of a spectrum
+    scale = field.float_(default=1.0, step=1.0)
+    # whether to scale a spectrum or not
+    use_scale = field.bool_(default=False)
+
+    @n_mels.validate
+    def validate_n_mels(self, value: int):
+        return 0 < value
+
+    # keep 0 <= fmin < fmax <= the Nyquist frequency
+    # (otherwise the filters are empty)
+    @fmin.validate
+    def validate_fmin(self, value: float):
+        fmax = self.fmax if 0.0 < self.fmax else self.sample_rate / 2.0
+        return 0.0 <= value < fmax
+
+    @fmax.validate
+    def validate_fmax(self, value: float):
+        if value == 0.0:
+            return self.fmin < self.sample_rate / 2.0
+        return self.fmin < value <= self.sample_rate / 2.0
+
+    @window_size.compute
+    def update_window(self):
+        self.window = sp.signal.get_window(
+            'hann', self.window_size,
+        ).astype(self.dtype)
+
+    # the filterbank is shared among the analyzers of the same configuration
+    @sample_rate.compute
+    @window_size.compute
+    @n_mels.compute
+    @fmin.compute
+    @fmax.compute
+    def update_filterbank(self):
+        self.filterbank = filterbank.mel(
+            self.sample_rate,
+            self.window_size,
+            self.n_mels,
+            self.fmin,
+            self.fmax if 0.0 < self.fmax else None,
+            dtype=self.dtype,
+        )
+
+    def __init__(self):
+        self.update_window()
+        self.update_filterbank()
+
+    def analyze(self, signal: np.ndarray):
+        # (channels, frequencies)
+        spectrum = filterbank.power_spectrum(signal, self.window)
+        # (channels, mel bands) by a single sparse matrix product
+        mel_spectrum = self.filterbank.apply(spectrum)
+
+        if self.use_scale:
+            mel_spectrum *= self.scale
+
+        return {
+            'spectrum': list(mel_spectrum),
+        }
@@ -1,11 +1,21 @@
 import numpy as np
 import scipy as sp
+import scipy.fft
 import scipy.signal
 
 from _lib.analyzer import BaseAnalyzer, group, field
 
 
 class Analyzer (BaseAnalyzer):
+    # receive signals of the shape (channels, window_size)
+    channel_major = True
+    # the spectra of the channels are analyzed separately
+    # (split into groups of channels with --analysis-workers)
+    channel_independent = True
+    channel_results = ('spectrum',)
+    # only the lower half of the spectrum is analyzed when it is overloaded
+    quality_levels = 2
+
     # automatically define the default group (empty string group) at first
 
     # the sample rate of input signals
@@ -53,10 +63,11 @@ class Analyzer (BaseAnalyzer):
     @window_size.compute
     @window_name.compute
     def update_window(self):
+        # keep the window in the precision of the signal
         self.window = sp.signal.get_window(
             self.window_name,
             self.window_size,
-        )
+        ).astype(self.dtype)
         self.window_sum = self.window.sum() ** 2.0
 
     def __init__(self):
@@ -65,12 +76,24 @@ class Analyzer (BaseAnalyzer):
         self.update_window()
 
     def analyze(self, signal: np.ndarray):
-        # from (frames, channels) to (channels, frames)
-        signal = signal.T
         # multiply the window
         signal *= self.window
-        # calculate the one side of the power spectrum
-        spectrum = np.abs(np.fft.rfft(signal, axis=1)) ** 2
+        if self.quality == 0:
+            # calculate the one side of the power spectrum
+            # (scipy.fft keeps single precision unlike numpy.fft)
+            spectrum = np.abs(sp.fft.rfft(signal, axis=1)) ** 2
+        else:
+            # the FFT of the half length over the sums of sample pairs
+            # (a crude low-pass) gives the lower half of the frequencies
+            # at the same resolution, and the upper half is left zero
+            half = self.window_size // 2
+            pairs = signal[:, 0:2 * half:2] + signal[:, 1:2 * half:2]
+            low = np.abs(sp.fft.rfft(pairs, axis=1)) ** 2
+            spectrum = np.zeros(
+                (signal.shape[0], self.window_size // 2 + 1),
+                dtype=low.dtype,
+            )
+            spectrum[:, :low.shape[1]] = low
 
         if self.use_scale:
             spectrum *= self.scale
@@ -1,6 +1,6 @@
 import numpy as np
 
-from _lib.analyzer import BaseAnalyzer, group, field
+from _lib.analyzer import BaseAnalyzer, group, field, envelope
 
 
 class Analyzer (BaseAnalyzer):
@@ -24,9 +24,26 @@ class Analyzer (BaseAnalyzer):
     # * When the client-side name is not specified,
     #   the attribute name will be used instead.
 
-    # # The initializer can be omitted when no callback is defined.
-    # def __init__(self):
-    #     pass
+    # define another group (in the global scope)
+    group('Display')
+    # the width of the plot reported by the client (0 means no decimation)
+    display_width = field.int_('Display width', default=0, min=0)
+
+    # the envelope is rebuilt from the whole window
+    # when the samples are no longer contiguous
+    @window_size.compute
+    @frame_step.compute
+    @scale.compute
+    @use_scale.compute
+    @display_width.compute
+    def reset_envelope(self):
+        self.envelope = None
+
+    def __init__(self):
+        self.reset_envelope()
+
+    def reset(self):
+        self.reset_envelope()
 
     def analyze(self, signal: np.ndarray):
         # sum values along the channels axis
@@ -35,8 +52,26 @@ class Analyzer (BaseAnalyzer):
         if self.use_scale:
             signal *= self.scale
 
-        # send the result to the client side
+        if self.display_width <= 0 or self.window_size <= self.display_width:
+            # send the result to the client side
+            return {
+                # 1D numpy array can be sent directly
+                'waveform': signal,
+            }
+
+        step = self.frame_step * self.decimation
+        if self.envelope is None or self.window_size < step:
+            self.envelope = envelope.MinMaxEnvelope(
+                self.window_size,
+                self.display_width,
+            )
+            self.envelope.reset(signal)
+        else:
+            # reduce only the newly arrived samples
+            self.envelope.update(signal[-step:])
+
+        # send the per-pixel envelope instead of all the samples
         return {
-            # 1D numpy array can be sent directly
-            'waveform': signal,
+            'minimum': self.envelope.minimum,
+            'maximum': self.envelope.maximum,
         }
@@ -1,16 +1,18 @@
 import sys
 import asyncio
 
-import sounddevice as sd
-
-import _lib.coroutine as coroutine
-
 from argparse import ArgumentParser, Namespace, ArgumentDefaultsHelpFormatter
 
 from typing import Optional, Sequence
 
 
+# sounddevice (PortAudio) and _lib.coroutine (numpy, socketio, aiohttp...)
+# are imported where they are needed in order to start up quickly.
+
+
 def get_input_devices():
+    import sounddevice as sd
+
     return [
         (device_id, device_dict)
         for device_id, device_dict in enumerate(sd.query_devices())
@@ -18,9 +20,65 @@ def get_input_devices():
     ]
 
 
+def print_input_devices():
+    import sounddevice as sd
+
+    default_device = sd.default.device[0]
+    for device_id, device_dict in get_input_devices():
+        is_default = default_device in (device_id, device_dict['name'])
+        print(
+            '{} {:>2} {} ({} in)'.format(
+                '*' if is_default else ' ',
+                device_id,
+                device_dict['name'],
+                device_dict['max_input_channels'],
+            )
+        )
+
+
+def define_input_parser(parser: ArgumentParser):
+    """Define the arguments of the input signal and the device.
+
+    The device is validated by `validate_input_args` after parsing
+    so that the devices are not enumerated unless it is specified.
+    """
+    parser.add_argument(
+        '--sample-rate', type=float,
+        default=16000.0,
+        help='sample rate of input signal in hertz',
+    )
+    parser.add_argument(
+        '--channels', type=int,
+        default=1,
+        help='the number of signal channels',
+    )
+    parser.add_argument(
+        '--device', type=int,
+        default=None,
+        help='the ID of an audio input device (the default device if omitted)',
+    )
+    parser.add_argument(
+        '--show-devices', action='store_true',
+        help='show the all input devices and exit',
+    )
+
+
+def validate_input_args(parser: ArgumentParser, args: Namespace):
+    if args.show_devices or args.device is None:
+        return
+
+    input_ids = [device_id for device_id, _ in get_input_devices()]
+    if args.device not in input_ids:
+        parser.error(
+            'argument --device: invalid choice: {} (choose from {})'.format(
+                args.device,
+                ', '.join(str(device_id) for device_id in input_ids),
+            )
+        )
+
+
 class AnalyzerRoutine:
     def define_parser(self, parser: ArgumentParser):
-        input_ids = [device_id for device_id, _ in get_input_devices()]
         parser.add_argument(
             '--host', type=str,
             default='localhost',
@@ -31,38 +89,73 @@ class AnalyzerRoutine:
             default=8080,
             help='port of the analyzer server',
         )
+        define_input_parser(parser)
+        parser.add_argument(
+            '--default-frame-step', type=int,
+            default=128,
+            help='default signal clipping interval in samples',
+        )
+        parser.add_argument(
+            '--default-window-size', type=int,
+            default=2048,
+            help='default signal clipping window size in samples',
+        )
         parser.add_argument(
-            '--sample-rate', type=float,
-            default=16000.0,
-            help='sample rate of input signal in hertz',
+            '--no-skip', action='store_false', dest='skip',
+            help='do not skip samples when the input latency exceeds'
+            ' the max latency',
         )
         parser.add_argument(
-            '--channels', type=int,
-            default=1,
-            help='the number of signal channels',
+            '--target-latency', type=float,
+            default=50.0,
+            help='the input latency in milliseconds restored by skipping',
         )
         parser.add_argument(
-            '--device', type=int, choices=input_ids,
-            default=sd.default.device[0],
-            help='the ID of an audio input device',
+            '--max-latency', type=float,
+            default=200.0,
+            help='the input latency in milliseconds to start skipping',
         )
         parser.add_argument(
-            '--show-devices', action='store_true',
-            help='show the all input devices and exit',
+            '--websocket', action='store_true',
+            help='serve the raw WebSocket transport besides socket.io',
         )
         parser.add_argument(
-            '--default-frame-step', type=int,
-            default=128,
-            help='default signal clipping interval in samples',
+            '--store', type=str, dest='store_path',
+            default=None,
+            help='SQLite file to store the results in',
         )
         parser.add_argument(
-            '--default-window-size', type=int,
-            default=2048,
-            help='default signal clipping window size in samples',
+            '--store-raw-retention', type=float,
+            default=600.0,
+            help='seconds to keep the raw results in the store',
         )
         parser.add_argument(
-            '--no-skip', action='store_false', dest='skip',
-            help='do not skip samples when the input data queue is full',
+            '--agents', action='store_true',
+            help='accept capture agents (agent.py) streaming signals',
+        )
+        parser.add_argument(
+            '--no-input', action='store_false', dest='local_input',
+            help='do not capture signals from the local input device',
+        )
+        parser.add_argument(
+            '--prewarm', action='store_true',
+            help='load all analyzers in the background after launching',
+        )
+        parser.add_argument(
+            '--dtype', choices=['float32', 'float64'],
+            default='float32',
+            help='the floating point precision of the analysis',
+        )
+        parser.add_argument(
+            '--capture-dtype', choices=['float32', 'int16'],
+            default='float32',
+            help='the sample format captured from the input device',
+        )
+        parser.add_argument(
+            '--analysis-workers', type=int,
+            default=0,
+            help='split the channels of the channel-independent analyzers'
+            ' into this number of threads (disabled if less than 2)',
         )
 
     def setup(self, args: Namespace):
@@ -75,22 +168,25 @@ class AnalyzerRoutine:
         self.default_window_size: int = args.default_window_size
         self.default_frame_step: int = args.default_frame_step
         self.skip: bool = args.skip
+        self.target_latency: float = args.target_latency
+        self.max_latency: float = args.max_latency
+        self.websocket: bool = args.websocket
+        self.store_path: Optional[str] = args.store_path
+        self.store_raw_retention: float = args.store_raw_retention
+        self.agents: bool = args.agents
+        self.local_input: bool = args.local_input
+        self.prewarm: bool = args.prewarm
+        self.dtype: str = args.dtype
+        self.capture_dtype: str = args.capture_dtype
+        self.analysis_workers: int = args.analysis_workers
 
     def main(self):
         if self.show_devices:
-            default_device = sd.default.device[0]
-            for device_id, device_dict in get_input_devices():
-                is_default = default_device in (device_id, device_dict['name'])
-                print(
-                    '{} {:>2} {} ({} in)'.format(
-                        '*' if is_default else ' ',
-                        device_id,
-                        device_dict['name'],
-                        device_dict['max_input_channels'],
-                    )
-                )
+            print_input_devices()
             return
 
+        import _lib.coroutine as coroutine
+
         try:
             asyncio.run(
                 coroutine.application_main(
@@ -102,6 +198,17 @@ class AnalyzerRoutine:
                     default_window_size=self.default_window_size,
                     default_frame_step=self.default_frame_step,
                     skip=self.skip,
+                    websocket=self.websocket,
+                    store_path=self.store_path,
+                    store_raw_retention=self.store_raw_retention,
+                    local_input=self.local_input,
+                    agents=self.agents,
+                    prewarm=self.prewarm,
+                    dtype=self.dtype,
+                    capture_dtype=self.capture_dtype,
+                    analysis_workers=self.analysis_workers,
+                    target_latency=self.target_latency,
+                    max_latency=self.max_latency,
                 )
             )
         except KeyboardInterrupt:
@@ -114,6 +221,8 @@ class AnalyzerRoutine:
         )
         self.define_parser(parser)
         args = parser.parse_args(command_line_args)
+        if args.local_input:
+            validate_input_args(parser, args)
 
         self.setup(args)
         self.main()
@@ -0,0 +1,167 @@
+import sys
+import importlib
+import pkgutil
+
+from argparse import ArgumentParser, Namespace, ArgumentDefaultsHelpFormatter
+
+from typing import Optional, Sequence, List, Tuple
+
+
+# Analyze a random signal with every analyzer in each precision
+# and list the floating point results not kept in the precision
+# (the server casts them before sending, which hides the upcasts).
+
+
+def find_mismatches(results, dtype, path: str = '') -> List[Tuple[str, str]]:
+    import numpy as np
+
+    if isinstance(results, dict):
+        items = results.items()
+    elif isinstance(results, (tuple, list)):
+        items = enumerate(results)
+    elif isinstance(results, np.ndarray):
+        if results.dtype.kind == 'f':
+            expected = dtype
+        elif results.dtype.kind == 'c':
+            expected = np.result_type(dtype, np.complex64)
+        else:
+            return []
+        if results.dtype != expected:
+            return [(path, str(results.dtype))]
+        return []
+    else:
+        return []
+
+    mismatches = []
+    for key, value in items:
+        mismatches.extend(find_mismatches(
+            value,
+            dtype,
+            '{}/{}'.format(path, key) if path else str(key),
+        ))
+    return mismatches
+
+
+def check_analyzer(
+    name: str,
+    dtype_name: str,
+    sample_rate: float,
+    channels: int,
+    window_size: int,
+    frame_step: int,
+) -> List[Tuple[str, str]]:
+    import numpy as np
+    from _lib.analyzer import BaseAnalyzer
+    from _lib.coroutine.application import configure_analyzer_class
+
+    BaseAnalyzer.default_dtype = np.dtype(dtype_name)
+    analyzer_class = importlib.import_module(
+        'analyzers.{}'.format(name),
+    ).Analyzer
+    configure_analyzer_class(
+        analyzer_class,
+        sample_rate,
+        channels,
+        window_size,
+        frame_step,
+    )
+    analyzer = analyzer_class()
+
+    rng = np.random.default_rng(0)
+    signal = rng.uniform(-1.0, 1.0, (channels, window_size))
+    signal = signal.astype(analyzer.dtype)
+    if not analyzer.channel_major:
+        signal = np.ascontiguousarray(signal.T)
+    results = analyzer.analyze(signal)
+    return find_mismatches(results, analyzer.dtype)
+
+
+class CheckDtypesRoutine:
+    def define_parser(self, parser: ArgumentParser):
+        parser.add_argument(
+            '--dtype', type=str, nargs='+',
+            default=['float32', 'float64'],
+            choices=['float32', 'float64'],
+            help='precisions of the analysis to check',
+        )
+        parser.add_argument(
+            '--sample-rate', type=float,
+            default=44100.0,
+            help='sample rate of the random signal',
+        )
+        parser.add_argument(
+            '--channels', type=int,
+            default=2,
+            help='the number of channels of the random signal',
+        )
+        parser.add_argument(
+            '--window-size', type=int,
+            default=2048,
+            help='window size of the analyzers',
+        )
+        parser.add_argument(
+            '--frame-step', type=int,
+            default=512,
+            help='frame step of the analyzers',
+        )
+        parser.add_argument(
+            'analyzers', type=str, nargs='*',
+            help='names of the analyzers to check (all by default)',
+        )
+
+    def setup(self, args: Namespace):
+        self.dtypes: List[str] = args.dtype
+        self.sample_rate: float = args.sample_rate
+        self.channels: int = args.channels
+        self.window_size: int = args.window_size
+        self.frame_step: int = args.frame_step
+        self.analyzers: List[str] = args.analyzers
+
+    def main(self) -> int:
+        names = self.analyzers
+        if not names:
+            import analyzers
+            names = [
+                name
+                for _, name, _ in pkgutil.walk_packages(analyzers.__path__)
+            ]
+
+        n_failed = 0
+        for dtype_name in self.dtypes:
+            for name in names:
+                mismatches = check_analyzer(
+                    name,
+                    dtype_name,
+                    self.sample_rate,
+                    self.channels,
+                    self.window_size,
+                    self.frame_step,
+                )
+                if mismatches:
+                    n_failed += 1
+                    print('FAIL {} ({}): {}'.format(
+                        name,
+                        dtype_name,
+                        ', '.join(
+                            '{} is {}'.format(path, dtype)
+                            for path, dtype in mismatches
+                        ),
+                    ))
+                else:
+                    print('ok   {} ({})'.format(name, dtype_name))
+        return 1 if n_failed else 0
+
+    def run(self, command_line_args: Optional[Sequence[str]] = None):
+        parser = ArgumentParser(
+            prog=sys.argv[0],
+            formatter_class=ArgumentDefaultsHelpFormatter,
+        )
+        self.define_parser(parser)
+        args = parser.parse_args(command_line_args)
+
+        self.setup(args)
+        return self.main()
+
+
+if __name__ == '__main__':
+    sys.exit(CheckDtypesRoutine().run())
@@ -1,14 +1,32 @@
 from aiohttp import web
-from aiohttp_jinja2 import render_template
+
+from _lib.util import numpy_to_bytes, pack_message
+from _lib.static import StaticFiles, PageCache
 
 import sys
 import os
+import time
+import asyncio
 import importlib
 import pkgutil
 import traceback
 
 
 routes = web.RouteTableDef()
+# the manifest and the compressed variants are emitted by webpack
+static_files = StaticFiles(
+    {
+        prefix: directory
+        for prefix, directory in [
+            ('/analyzers', 'analyzers'),
+            ('/static', 'static'),
+            ('/dist', 'dist'),
+        ]
+        if os.path.exists(directory)
+    },
+    manifest_path=os.path.join('dist', 'manifest.json'),
+)
+page_cache = PageCache(static_files)
 
 
 @routes.get('/')
@@ -19,9 +37,11 @@ async def index(request: web.Request):
         for _, name, _ in pkgutil.walk_packages(analyzers.__path__)
     ]
 
-    return render_template(
+    # a new analyzer changes the page as well as the templates
+    return page_cache.respond(
+        request,
+        ('index', tuple(analyzer_names)),
         'pages/index.html',
-        request=request,
         context={
             'analyzer_names': analyzer_names,
         },
@@ -41,19 +61,89 @@ async def analysis(request: web.Request):
     except Exception:
         raise web.HTTPInternalServerError(text=traceback.format_exc())
 
-    return render_template(
+    return page_cache.respond(
+        request,
+        ('analyzers', analyzer_name),
         '{}/index.html'.format(analyzer_name),
-        request=request,
         context={
             'analyzer_name': analyzer_name
         },
     )
 
 
+@routes.get('/transports')
+async def transports(request: web.Request):
+    names = ['socket.io']
+    if 'websocket_server' in request.app:
+        names.insert(0, 'websocket')
+    return web.json_response(names)
+
+
+@routes.get('/ws')
+async def websocket(request: web.Request):
+    if 'websocket_server' not in request.app:
+        raise web.HTTPNotFound()
+    return await request.app['websocket_server'].handle(request)
+
+
+@routes.get('/agent')
+async def agent(request: web.Request):
+    if 'agent_server' not in request.app:
+        raise web.HTTPNotFound()
+    return await request.app['agent_server'].handle(request)
+
+
+@routes.get('/agents')
+async def agent_list(request: web.Request):
+    if 'agent_server' not in request.app:
+        return web.json_response([])
+    return web.json_response([
+        source.to_client()
+        for source in request.app['agent_server'].agents.values()
+    ])
+
+
+@routes.get('/store')
+async def store_series(request: web.Request):
+    if 'result_store' not in request.app:
+        raise web.HTTPNotFound()
+    store = request.app['result_store']
+    loop = asyncio.get_event_loop()
+    series = await loop.run_in_executor(None, store.list_series)
+    return web.json_response(series)
+
+
+@routes.get('/store/{name:.+}')
+async def store_query(request: web.Request):
+    if 'result_store' not in request.app:
+        raise web.HTTPNotFound()
+    store = request.app['result_store']
+    try:
+        start = float(request.query.get('start', 0.0))
+        end = float(request.query.get('end', time.time()))
+        max_points = int(request.query.get('max_points', 2000))
+    except ValueError:
+        raise web.HTTPBadRequest(text='Invalid query parameters.')
+
+    loop = asyncio.get_event_loop()
+    try:
+        data = await loop.run_in_executor(
+            None,
+            store.query,
+            request.match_info['name'],
+            start,
+            end,
+            max_points,
+        )
+    except KeyError:
+        raise web.HTTPNotFound()
+
+    # the same binary format as the raw WebSocket transport
+    return web.Response(
+        body=pack_message('series', [numpy_to_bytes(data)]),
+        content_type='application/octet-stream',
+    )
+
+
 # static resources
-if os.path.exists('analyzers'):
-    routes.static('/analyzers', 'analyzers')
-if os.path.exists('static'):
-    routes.static('/static', 'static')
-if os.path.exists('dist'):
-    routes.static('/dist', 'dist')
+static_files.add_routes(routes)
@@ -1,283 +1,103 @@
-import { io, Socket } from 'socket.io-client';
+import { unpack_message } from './packet';
+import { ConvertibleType, bytes_to_typed } from './portable';
+import { Canvas, LayerSpec, LayerScheduler } from './canvas-renderer';
+import type { WorkerRequest } from './analyzer.worker';
 
 
-type TypedArray = Int8Array | Uint8Array | Int16Array | Uint16Array | Int32Array | Uint32Array | Float32Array | Float64Array;
-interface PortableTypedArray {
-    _dtype: string;
-    _buffer: ArrayBuffer;
-};
-type ConvertibleType = null | number | string | TypedArray | ArrayBuffer | ConvertibleType[] | { [key: string]: ConvertibleType };
-type PortableType = null | number | string | PortableTypedArray | ArrayBuffer | PortableType[] | { [key: string]: PortableType };
-
-
-function make_typed(dtype: string, buffer: ArrayBuffer) {
-    switch (dtype) {
-        case "int8": {
-            return new Int8Array(buffer);
-        }
-        case "uint8": {
-            return new Uint8Array(buffer);
-        }
-        case "int16": {
-            const view = new DataView(buffer);
-            const length = view.byteLength / Int16Array.BYTES_PER_ELEMENT;
-            const data = new Int16Array(length);
-            for (let index = 0; index < length; ++index) {
-                const offset = index * Int16Array.BYTES_PER_ELEMENT;
-                data[index] = view.getInt16(offset, false);
-            }
-            return data;
-        }
-        case "uint16": {
-            const view = new DataView(buffer);
-            const length = view.byteLength / Uint16Array.BYTES_PER_ELEMENT;
-            const data = new Uint16Array(length);
-            for (let index = 0; index < length; ++index) {
-                const offset = index * Uint16Array.BYTES_PER_ELEMENT;
-                data[index] = view.getUint16(offset, false);
-            }
-            return data;
-        }
-        case "int32": {
-            const view = new DataView(buffer);
-            const length = view.byteLength / Int32Array.BYTES_PER_ELEMENT;
-            const data = new Int32Array(length);
-            for (let index = 0; index < length; ++index) {
-                const offset = index * Int32Array.BYTES_PER_ELEMENT;
-                data[index] = view.getInt32(offset, false);
-            }
-            return data;
-        }
-        case "uint32": {
-            const view = new DataView(buffer);
-            const length = view.byteLength / Uint32Array.BYTES_PER_ELEMENT;
-            const data = new Uint32Array(length);
-            for (let index = 0; index < length; ++index) {
-                const offset = index * Uint32Array.BYTES_PER_ELEMENT;
-                data[index] = view.getUint32(offset, false);
-            }
-            return data;
-        }
-        case "float32": {
-            const view = new DataView(buffer);
-            const length = view.byteLength / Float32Array.BYTES_PER_ELEMENT;
-            const data = new Float32Array(length);
-            for (let index = 0; index < length; ++index) {
-                const offset = index * Float32Array.BYTES_PER_ELEMENT;
-                data[index] = view.getFloat32(offset, false);
-            }
-            return data;
-        }
-        case "float64": {
-            const view = new DataView(buffer);
-            const length = view.byteLength / Float64Array.BYTES_PER_ELEMENT;
-            const data = new Float64Array(length);
-            for (let index = 0; index < length; ++index) {
-                const offset = index * Float64Array.BYTES_PER_ELEMENT;
-                data[index] = view.getFloat64(offset, false);
-            }
-            return data;
-        }
-        default: {
-            throw new Error(`Unknown dtype '${dtype}'.`);
-        }
-    }
-}
-
-
-function make_buffer(typed: TypedArray) {
-    if (typed instanceof Int8Array) {
-        return {
-            '_dtype': "int8",
-            '_buffer': typed.buffer,
-        }
-    } else if (typed instanceof Uint8Array) {
-        return {
-            '_dtype': "uint8",
-            '_buffer': typed.buffer,
-        }
-    } else if (typed instanceof Int16Array) {
-        const buffer = new ArrayBuffer(typed.byteLength);
-        const view = new DataView(buffer);
-        const length = typed.length;
-        for (let index = 0; index < length; ++index) {
-            const offset = index * Int16Array.BYTES_PER_ELEMENT;
-            view.setInt16(offset, typed[index], false);
-        }
-        return {
-            '_dtype': "int16",
-            '_buffer': buffer,
-        }
-    } else if (typed instanceof Uint16Array) {
-        const buffer = new ArrayBuffer(typed.byteLength);
-        const view = new DataView(buffer);
-        const length = typed.length;
-        for (let index = 0; index < length; ++index) {
-            const offset = index * Uint16Array.BYTES_PER_ELEMENT;
-            view.setUint16(offset, typed[index], false);
-        }
-        return {
-            '_dtype': "uint16",
-            '_buffer': buffer,
-        }
-    } else if (typed instanceof Int32Array) {
-        const buffer = new ArrayBuffer(typed.byteLength);
-        const view = new DataView(buffer);
-        const length = typed.length;
-        for (let index = 0; index < length; ++index) {
-            const offset = index * Int32Array.BYTES_PER_ELEMENT;
-            view.setInt32(offset, typed[index], false);
-        }
-        return {
-            '_dtype': "int32",
-            '_buffer': buffer,
-        }
-    } else if (typed instanceof Uint32Array) {
-        const buffer = new ArrayBuffer(typed.byteLength);
-        const view = new DataView(buffer);
-        const length = typed.length;
-        for (let index = 0; index < length; ++index) {
-            const offset = index * Uint32Array.BYTES_PER_ELEMENT;
-            view.setUint32(offset, typed[index], false);
-        }
-        return {
-            '_dtype': "uint32",
-            '_buffer': buffer,
-        }
-    } else if (typed instanceof Float32Array) {
-        const buffer = new ArrayBuffer(typed.byteLength);
-        const view = new DataView(buffer);
-        const length = typed.length;
-        for (let index = 0; index < length; ++index) {
-            const offset = index * Float32Array.BYTES_PER_ELEMENT;
-            view.setFloat32(offset, typed[index], false);
-        }
-        return {
-            '_dtype': "float32",
-            '_buffer': buffer,
-        }
-    } else if (typed instanceof Float64Array) {
-        const buffer = new ArrayBuffer(typed.byteLength);
-        const view = new DataView(buffer);
-        const length = typed.length;
-        for (let index = 0; index < length; ++index) {
-            const offset = index * Float64Array.BYTES_PER_ELEMENT;
-            view.setFloat64(offset, typed[index], false);
-        }
-        return {
-            '_dtype': "float64",
-            '_buffer': buffer,
-        }
-    } else {
-        throw new Error('Unknown typed array.');
-    }
-}
+/**
+ * The connection, the decoding and the drawing run in a worker
+ * so that the main thread is not blocked by the results.
+ */
+const worker = new Worker(new URL('./analyzer.worker.ts', import.meta.url));
+const target = new EventTarget();
+let connecting = false;
+/** The layers drawn on the main thread when OffscreenCanvas is not supported. */
+let fallback_scheduler: null | LayerScheduler = null;
 
-function typed_to_bytes(typed: ConvertibleType): PortableType {
-    if (typeof typed == "object") {
-        if (typed === null) {
-            return null;
-        } else if (typed instanceof Int8Array
-            || typed instanceof Uint8Array
-            || typed instanceof Int16Array
-            || typed instanceof Uint16Array
-            || typed instanceof Int32Array
-            || typed instanceof Uint32Array
-            || typed instanceof Float32Array
-            || typed instanceof Float64Array) {
-            return make_buffer(typed);
-        } else if (typed instanceof ArrayBuffer) {
-            return typed;
-        } else if (Array.isArray(typed)) {
-            return typed.map(typed_to_bytes);
-        } else {
-            if ('_dtype' in typed) {
-                throw new Error("Illegal property '_dtype'.");
-            }
-            const data: { [key: string]: PortableType } = {};
-            for (const prop in typed) {
-                data[prop] = typed_to_bytes(typed[prop]);
-            }
-            return data;
-        }
-    } else {
-        return typed;
-    }
-}
 
-function instanceofPortableTypedArray(data: any): data is PortableTypedArray {
-    return '_dtype' in data;
+function request(message: WorkerRequest, transfer: Transferable[] = []) {
+    worker.postMessage(message, transfer);
 }
 
-function bytes_to_typed(data: PortableType): ConvertibleType {
-    if (typeof data == "object") {
-        if (data === null) {
-            return null;
-        } else if (data instanceof ArrayBuffer) {
-            return data;
-        } else if (Array.isArray(data)) {
-            return data.map(bytes_to_typed);
-        } else if (instanceofPortableTypedArray(data)) {
-            return make_typed(data._dtype, data._buffer);
-        } else {
-            const typed: { [key: string]: ConvertibleType } = {};
-            for (const prop in data) {
-                typed[prop] = bytes_to_typed(data[prop]);
-            }
-            return typed;
-        }
-    } else {
-        return data;
+worker.addEventListener('message', function (event: MessageEvent<{ event: string, detail: ConvertibleType }>) {
+    const { event: name, detail } = event.data;
+    if (name == 'results' && fallback_scheduler != null) {
+        fallback_scheduler.push(detail);
     }
-}
-
-const target = new EventTarget();
-let socket: null | Socket = null;
+    target.dispatchEvent(new CustomEvent(name, { detail }));
+});
 
 
 export default {
     on(event: string, listener: (data: ConvertibleType) => void) {
+        if (event == 'results') {
+            // the results are sent to the main thread only when listened
+            request({ type: 'subscribe', event });
+        }
         target.addEventListener(event, (function (event: CustomEvent<ConvertibleType>) {
             listener(event.detail);
         }) as EventListener);
     },
 
     setProperties(properties: { [key: string]: ConvertibleType }) {
-        if (socket == null) {
+        if (!connecting) {
             throw new Error('Not connected to an analyzer.');
         }
 
-        socket.emit('set_properties', typed_to_bytes(properties));
+        request({ type: 'set_properties', properties });
     },
 
-    connect(analyzer_name: string) {
-        if (socket != null) {
-            throw new Error('Already connected to the analyzer.');
+    /**
+     * Draw the results on a canvas in the worker (paced by the animation frames).
+     *
+     * e.g. `analyzer.render(canvas, [{ type: 'pseudocolor', data: 'spectrum/0', ... }])`
+     * (see `LayerSpec` in `src/canvas-renderer/layer.ts`).
+     * A canvas can be rendered only once because it is transferred to the worker.
+     */
+    render(canvas: HTMLCanvasElement, layers: LayerSpec[]) {
+        if ('transferControlToOffscreen' in canvas) {
+            const offscreen = canvas.transferControlToOffscreen();
+            request({ type: 'render', canvas: offscreen, layers }, [offscreen]);
+        } else {
+            if (fallback_scheduler == null) {
+                fallback_scheduler = new LayerScheduler();
+                request({ type: 'subscribe', event: 'results' });
+            }
+            fallback_scheduler.add(canvas as Canvas, layers);
         }
+    },
 
-        socket = io();
-        socket.on('connect', function () {
-            socket!.emit('start_analysis', analyzer_name);
-        });
-        socket.on('define_properties', function (data: PortableType) {
-            target.dispatchEvent(new CustomEvent('define_properties', {
-                detail: bytes_to_typed(data)
-            }));
-        });
-        socket.on('properties', function (data: PortableType) {
-            target.dispatchEvent(new CustomEvent('properties', {
-                detail: bytes_to_typed(data)
-            }));
-        });
-        socket.on('results', function (data: PortableType) {
-            target.dispatchEvent(new CustomEvent('results', {
-                detail: bytes_to_typed(data)
-            }));
-        });
-        socket.on('internal_error', function (data: PortableType) {
-            target.dispatchEvent(new CustomEvent('error', {
-                detail: bytes_to_typed(data)
-            }));
+    /**
+     * Query a series of the results stored by the server (`--store`),
+     * such as `stft/local/2048/spectrum/0`, in the range of UNIX time in seconds.
+     */
+    async history(name: string, start: number, end: number, max_points: number = 2000) {
+        const path = name.split('/').map(encodeURIComponent).join('/');
+        const params = new URLSearchParams({
+            start: start.toString(),
+            end: end.toString(),
+            max_points: max_points.toString(),
         });
+        const response = await fetch(`/store/${path}?${params}`);
+        if (!response.ok) {
+            throw new Error(`Failed to query the store (${response.status}).`);
+        }
+        const { args } = unpack_message(await response.arrayBuffer());
+        return bytes_to_typed(args[0]);
+    },
+
+    connect(analyzer_name: string, options: { [key: string]: ConvertibleType } = {}) {
+        if (connecting) {
+            throw new Error('Already connected to the analyzer.');
+        }
+
+        // the input source (a capture agent) chosen by `?source=<name>`
+        const source = new URLSearchParams(location.search).get('source');
+        if (source != null && !('source' in options)) {
+            options = Object.assign({ source }, options);
+        }
+
+        connecting = true;
+        request({ type: 'connect', analyzer_name, options, origin: location.origin });
     }
 };
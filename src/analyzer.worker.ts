@@ -0,0 +1,96 @@
+/**
+ * The worker receiving, decoding and drawing the results
+ * off the main thread (see `src/analyzer.ts`).
+ */
+import { open_connection, Connection } from './connection';
+import {
+    ConvertibleType, PortableType,
+    typed_to_bytes, bytes_to_typed, deep_copy, apply_delta, list_transferables,
+} from './portable';
+import { LayerScheduler } from './canvas-renderer/layer';
+
+
+/** The messages from the main thread. */
+export type WorkerRequest = {
+    type: 'connect';
+    analyzer_name: string;
+    options: { [key: string]: ConvertibleType };
+    origin: string;
+} | {
+    type: 'set_properties';
+    properties: { [key: string]: ConvertibleType };
+} | {
+    type: 'render';
+    canvas: OffscreenCanvas;
+    layers: any[];
+} | {
+    type: 'subscribe';
+    event: string;
+};
+
+const scope = self as unknown as Worker;
+const scheduler = new LayerScheduler();
+/** The events the main thread listens to besides the default ones. */
+const subscribed = new Set<string>();
+let socket: null | Connection = null;
+/** The last results kept to apply the next delta. */
+let last_results: ConvertibleType | undefined = undefined;
+
+
+function post(event: string, detail: ConvertibleType) {
+    scope.postMessage({ event, detail }, list_transferables(detail));
+}
+
+function listen(socket: Connection, analyzer_name: string, options: { [key: string]: ConvertibleType }) {
+    socket.on('connect', function () {
+        socket.emit('start_analysis', analyzer_name, typed_to_bytes(options));
+    });
+    socket.on('define_properties', function (data: PortableType) {
+        last_results = undefined;
+        post('define_properties', bytes_to_typed(data));
+    });
+    socket.on('properties', function (data: PortableType) {
+        post('properties', bytes_to_typed(data));
+    });
+    socket.on('results', function (data: PortableType) {
+        last_results = apply_delta(data, last_results);
+        scheduler.push(last_results);
+        if (subscribed.has('results')) {
+            // the copy owns its buffers, which are moved without copying
+            post('results', deep_copy(last_results));
+        }
+    });
+    socket.on('quality', function (data: PortableType) {
+        post('quality', bytes_to_typed(data));
+    });
+    socket.on('internal_error', function (data: PortableType) {
+        post('error', bytes_to_typed(data));
+    });
+}
+
+scope.addEventListener('message', function (event: MessageEvent<WorkerRequest>) {
+    const request = event.data;
+    switch (request.type) {
+        case 'connect': {
+            open_connection(request.origin).then(function (connection) {
+                socket = connection;
+                listen(socket, request.analyzer_name, request.options);
+            });
+            break;
+        }
+        case 'set_properties': {
+            if (socket != null) {
+                socket.emit('set_properties', typed_to_bytes(request.properties));
+            }
+            break;
+        }
+        case 'render': {
+            scheduler.add(request.canvas, request.layers);
+            break;
+        }
+        case 'subscribe': {
+            subscribed.add(request.event);
+            break;
+        }
+    }
+});
@@ -17,7 +17,7 @@ export const Color = {
     }
 };
 
-interface ColorLike {
+export interface ColorLike {
     r?: number,
     g?: number,
     b?: number,
@@ -28,6 +28,28 @@ export class ColorMap {
     getColor(key: number): Color {
         return { r: 0.0, g: 0.0, b: 0.0, a: 0.0 };
     }
+
+    /** The range of the keys mapped into the lookup table. */
+    getDomain(): [number, number] {
+        return [0.0, 1.0];
+    }
+
+    /**
+     * Precompute the RGBA bytes of `size` colors evenly spaced in the domain
+     * so that a value is colored by an index instead of `getColor`.
+     */
+    toLookupTable(size: number = 256): Uint8ClampedArray {
+        const [min, max] = this.getDomain();
+        const table = new Uint8ClampedArray(4 * size);
+        for (let index = 0; index < size; ++index) {
+            const color = this.getColor(min + (max - min) * index / Math.max(1, size - 1));
+            table[4 * index] = Math.round(color.r * 255);
+            table[4 * index + 1] = Math.round(color.g * 255);
+            table[4 * index + 2] = Math.round(color.b * 255);
+            table[4 * index + 3] = Math.round(color.a * 255);
+        }
+        return table;
+    }
 }
 
 export class SectionColorMap extends ColorMap {
@@ -53,6 +75,13 @@ export class SectionColorMap extends ColorMap {
         this._colors = sorted_sections.map(({ color }) => color);
     }
 
+    getDomain(): [number, number] {
+        if (this._keys.length == 0) {
+            return super.getDomain();
+        }
+        return [this._keys[0], this._keys[this._keys.length - 1]];
+    }
+
     getColor(key: number): Color {
         const index = d3.bisectLeft(this._keys, key);
 
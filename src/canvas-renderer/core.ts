@@ -1,5 +1,9 @@
 
 
+/** A canvas of the page or transferred to a worker. */
+export type Canvas = HTMLCanvasElement | OffscreenCanvas;
+export type Context2D = CanvasRenderingContext2D | OffscreenCanvasRenderingContext2D;
+
 export interface Renderer<T> {
     push(data: T): void;
 
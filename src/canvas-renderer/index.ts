@@ -1,4 +1,5 @@
 export * from './core'
 export * from './color'
 export * from './plot'
-export * from './pseudocolor'
\ No newline at end of file
+export * from './pseudocolor'
+export * from './layer'
\ No newline at end of file
@@ -0,0 +1,235 @@
+import { Canvas, Renderer } from "./core"
+import { Color, ColorLike, SectionColorMap } from "./color"
+import { Point, ViewBox, PlotRenderer } from "./plot"
+import { PseudoColorRenderer } from "./pseudocolor"
+
+
+type Data = Float32Array | Float64Array;
+
+/** `point = origin + scale * t` */
+export interface LinearMap {
+    origin: Point;
+    scale: Point;
+}
+
+/**
+ * The serializable description of a renderer fed by a part of the results.
+ *
+ * `data` is the path in the results (e.g. `spectrum/0`),
+ * or the paths of the arrays interleaved element by element.
+ */
+interface LayerBase {
+    data: string | string[];
+    /** reverse the data (e.g. the low frequencies at the bottom) */
+    reverse?: boolean;
+}
+
+export interface PlotLayer extends LayerBase {
+    type: 'plot';
+    viewBox: ViewBox;
+    /** the point of a bin by its center position in [0, 1] */
+    bin: LinearMap;
+    /** the point of a value */
+    value: LinearMap;
+    color?: Color;
+}
+
+export interface PseudoColorLayer extends LayerBase {
+    type: 'pseudocolor';
+    n_frames: number;
+    color_map: { key: number, color: ColorLike }[];
+}
+
+export type LayerSpec = PlotLayer | PseudoColorLayer;
+
+/**
+ * The layers of a spectrogram of up to two channels
+ * (the first one in green and the second one in blue over it)
+ * with the low frequencies at the bottom.
+ */
+export function spectrogram_layers(path: string = 'spectrum', n_frames: number = 256): PseudoColorLayer[] {
+    return [
+        {
+            type: 'pseudocolor',
+            data: `${path}/0`,
+            reverse: true,
+            n_frames,
+            color_map: [
+                { key: 0, color: { r: 0, g: 0, b: 0, a: 1 } },
+                { key: 1, color: { r: 0, g: 1, b: 0, a: 1 } },
+            ],
+        },
+        {
+            type: 'pseudocolor',
+            data: `${path}/1`,
+            reverse: true,
+            n_frames,
+            color_map: [
+                { key: 0, color: { r: 0, g: 0, b: 1, a: 0 } },
+                { key: 1, color: { r: 0, g: 0, b: 1, a: 1 } },
+            ],
+        },
+    ];
+}
+
+
+function map_linear(map: LinearMap, t: number): Point {
+    return {
+        x: map.origin.x + map.scale.x * t,
+        y: map.origin.y + map.scale.y * t,
+    };
+}
+
+/** Select the data of a layer (undefined if the results do not have it). */
+function select(results: any, data: string | string[]): Data | undefined {
+    if (Array.isArray(data)) {
+        const arrays = data.map(path => select(results, path));
+        if (arrays.some(array => array === undefined)) {
+            return undefined;
+        }
+        const length = Math.min(...arrays.map(array => array!.length));
+        const interleaved = new Float32Array(arrays.length * length);
+        for (let index = 0; index < length; ++index) {
+            for (let k = 0; k < arrays.length; ++k) {
+                interleaved[arrays.length * index + k] = arrays[k]![index];
+            }
+        }
+        return interleaved;
+    }
+
+    let value = results;
+    for (const key of data.split('/')) {
+        if (typeof value != "object" || value === null || !(key in value)) {
+            return undefined;
+        }
+        value = value[key];
+    }
+    return (value instanceof Float32Array || value instanceof Float64Array) ? value : undefined;
+}
+
+export class Layer {
+    _spec: LayerSpec
+    _renderer: Renderer<Data>
+    _size: number
+    /** the number of the frames kept by the renderer (0 if only the latest one is drawn) */
+    history: number
+
+    constructor(canvas: Canvas, spec: LayerSpec) {
+        this._spec = spec;
+        this._size = 1;
+        this.history = 0;
+        switch (spec.type) {
+            case 'plot': {
+                this._renderer = new PlotRenderer(
+                    canvas,
+                    spec.viewBox,
+                    bin => map_linear(spec.bin, (bin + 0.5) / this._size),
+                    value => map_linear(spec.value, value),
+                    spec.color ?? { r: 0, g: 0, b: 0, a: 1 },
+                );
+                break;
+            }
+            case 'pseudocolor': {
+                this._renderer = new PseudoColorRenderer(
+                    canvas,
+                    spec.n_frames,
+                    new SectionColorMap(spec.color_map),
+                );
+                // every frame is a column of the spectrogram
+                this.history = spec.n_frames;
+                break;
+            }
+            default:
+                throw new Error(`Unknown layer type '${(spec as LayerSpec).type}'`);
+        }
+    }
+
+    /** Push the data of the results (return false if not included). */
+    push(results: any) {
+        let data = select(results, this._spec.data);
+        if (data === undefined) {
+            return false;
+        }
+        if (this._spec.reverse) {
+            data = data.slice().reverse();
+        }
+        this._size = data.length;
+        this._renderer.push(data);
+        return true;
+    }
+
+    draw() {
+        this._renderer.draw();
+    }
+}
+
+function request_frame(callback: () => void) {
+    // requestAnimationFrame is not available in some workers
+    if (typeof requestAnimationFrame == "function") {
+        requestAnimationFrame(callback);
+    } else {
+        setTimeout(callback, 1000 / 60);
+    }
+}
+
+/**
+ * Draw the layers paced by the animation frames.
+ *
+ * Each layer is drawn once per animation frame. The layers keeping
+ * the history (e.g. spectrograms) are pushed all the results received
+ * since the last animation frame, and the others only the latest ones.
+ */
+export class LayerScheduler {
+    _layers: Layer[]
+    _pending: any[]
+    _requested: boolean
+
+    constructor() {
+        this._layers = [];
+        this._pending = [];
+        this._requested = false;
+    }
+
+    add(canvas: Canvas, specs: LayerSpec[]) {
+        for (const spec of specs) {
+            this._layers.push(new Layer(canvas, spec));
+        }
+    }
+
+    /** The number of the results worth keeping until the next animation frame. */
+    get capacity() {
+        return Math.max(1, ...this._layers.map(layer => layer.history));
+    }
+
+    push(results: any) {
+        this._pending.push(results);
+        // the animation frames stop in background tabs
+        const overflow = this._pending.length - this.capacity;
+        if (0 < overflow) {
+            this._pending.splice(0, overflow);
+        }
+        if (!this._requested) {
+            this._requested = true;
+            request_frame(() => this._draw());
+        }
+    }
+
+    _draw() {
+        this._requested = false;
+        const pending = this._pending;
+        this._pending = [];
+        if (pending.length == 0) {
+            return;
+        }
+        for (const layer of this._layers) {
+            const start = (0 < layer.history) ? Math.max(0, pending.length - layer.history) : pending.length - 1;
+            let pushed = false;
+            for (let index = start; index < pending.length; ++index) {
+                pushed = layer.push(pending[index]) || pushed;
+            }
+            if (pushed) {
+                layer.draw();
+            }
+        }
+    }
+}
@@ -1,13 +1,13 @@
-import { Renderer } from "./core"
+import { Canvas, Context2D, Renderer } from "./core"
 import { Color } from "./color"
 
 
-interface Point {
+export interface Point {
     x: number;
     y: number;
 }
 
-interface ViewBox {
+export interface ViewBox {
     left: number;
     top: number;
     width: number;
@@ -16,8 +16,8 @@ interface ViewBox {
 
 
 export class PlotRenderer implements Renderer<Float32Array | Float64Array> {
-    _canvas: HTMLCanvasElement
-    _ctx: CanvasRenderingContext2D
+    _canvas: Canvas
+    _ctx: Context2D
     _viewBox: ViewBox;
     _binToPoint: (bin: number) => Point;
     _valueToPoint: (value: number) => Point;
@@ -27,14 +27,14 @@ export class PlotRenderer implements Renderer<Float32Array | Float64Array> {
 
 
     constructor(
-        canvas: HTMLCanvasElement,
+        canvas: Canvas,
         viewBox: ViewBox,
         binToPoint: (bin: number) => Point,
         valueToPoint: (value: number) => Point,
         color: Color,
     ) {
         this._canvas = canvas;
-        this._ctx = this._canvas.getContext('2d')!;
+        this._ctx = this._canvas.getContext('2d') as Context2D;
         this._viewBox = Object.assign({}, viewBox);
         this._binToPoint = binToPoint;
         this._valueToPoint = valueToPoint;
@@ -1,29 +1,63 @@
-import { Renderer } from "./core"
+import { Canvas, Context2D, Renderer } from "./core"
 import { Color, ColorMap } from "./color"
 
 
+/** The number of the colors in the lookup table. */
+const LOOKUP_TABLE_SIZE = 256;
+
+
+function create_canvas(width: number, height: number): Canvas {
+    if (typeof OffscreenCanvas != "undefined") {
+        return new OffscreenCanvas(width, height);
+    }
+    const canvas = document.createElement('canvas');
+    canvas.width = width;
+    canvas.height = height;
+    return canvas;
+}
+
+/**
+ * Scrolling spectrogram kept in a ring buffer of (frames x bins) pixels.
+ *
+ * A pushed frame is written as a single column of the image through
+ * the color lookup table, and only the new columns are uploaded when drawn.
+ * The image is scaled onto the canvas in two parts split at the ring offset,
+ * so the newest frame is at the right end.
+ */
 export class PseudoColorRenderer implements Renderer<Float32Array | Float64Array> {
-    _canvas: HTMLCanvasElement
-    _ctx: CanvasRenderingContext2D
+    _canvas: Canvas
+    _ctx: Context2D
     _frame: number
     _nFrames: number
     _colorMap: ColorMap
+    _lookupTable: Uint8ClampedArray
+    _domain: [number, number]
 
-    _data: Float32Array | Float64Array
+    /** the ring buffer (a column per frame) */
+    _image: null | ImageData
+    _buffer: null | Canvas
+    _bufferCtx: null | Context2D
+    /** the number of the columns not uploaded to the buffer yet */
+    _dirty: number
 
 
     constructor(
-        canvas: HTMLCanvasElement,
+        canvas: Canvas,
         n_frames: number,
         color_map: ColorMap,
     ) {
         this._canvas = canvas;
-        this._ctx = this._canvas.getContext('2d')!;
-        this._nFrames = n_frames;
+        this._ctx = this._canvas.getContext('2d') as Context2D;
+        this._nFrames = Math.max(1, n_frames);
         this._colorMap = color_map;
+        this._lookupTable = color_map.toLookupTable(LOOKUP_TABLE_SIZE);
+        this._domain = color_map.getDomain();
 
         this._frame = this._nFrames - 1;
-        this._data = new Float32Array();
+        this._image = null;
+        this._buffer = null;
+        this._bufferCtx = null;
+        this._dirty = 0;
 
         this._init();
     }
@@ -36,44 +70,104 @@ export class PseudoColorRenderer implements Renderer<Float32Array | Float64Array
         this._ctx.restore();
     }
 
+    /** (Re)allocate the ring buffer filled with the color of zero. */
+    _allocate(n_bins: number) {
+        this._buffer = create_canvas(this._nFrames, n_bins);
+        this._bufferCtx = this._buffer.getContext('2d') as Context2D;
+        this._image = this._bufferCtx.createImageData(this._nFrames, n_bins);
+
+        const zero = this._lookupIndex(0);
+        const pixels = this._image.data;
+        for (let offset = 0; offset < pixels.length; offset += 4) {
+            pixels.set(this._lookupTable.subarray(4 * zero, 4 * zero + 4), offset);
+        }
+        this._frame = this._nFrames - 1;
+        this._dirty = this._nFrames;
+    }
+
+    _lookupIndex(value: number) {
+        const [min, max] = this._domain;
+        const t = (max == min) ? 0.0 : (value - min) / (max - min);
+        // NaN is colored by the lowest color
+        const index = Math.round(t * (LOOKUP_TABLE_SIZE - 1));
+        return (index > 0) ? Math.min(index, LOOKUP_TABLE_SIZE - 1) : 0;
+    }
+
     push(data: Float32Array | Float64Array) {
-        this._data = data.slice();
+        const n_bins = data.length;
+        if (n_bins == 0) return;
+        if (this._image == null || this._image.height != n_bins) {
+            this._allocate(n_bins);
+        }
+
         ++this._frame;
         if (this._nFrames <= this._frame) {
             this._frame = 0;
         }
+        this._dirty = Math.min(this._dirty + 1, this._nFrames);
+
+        // write only the new column (the bin 0 at the top)
+        const image = this._image!;
+        const pixels = image.data;
+        const table = this._lookupTable;
+        const stride = 4 * image.width;
+        let offset = 4 * this._frame;
+        for (let index = 0; index < n_bins; ++index) {
+            const color = 4 * this._lookupIndex(data[index]);
+            pixels[offset] = table[color];
+            pixels[offset + 1] = table[color + 1];
+            pixels[offset + 2] = table[color + 2];
+            pixels[offset + 3] = table[color + 3];
+            offset += stride;
+        }
+    }
+
+    /** Upload the columns from `left` (inclusive) to `right` (exclusive). */
+    _upload(left: number, right: number) {
+        if (left < right) {
+            this._bufferCtx!.putImageData(this._image!, 0, 0, left, 0, right - left, this._image!.height);
+        }
     }
 
     draw() {
-        const n_bins = this._data.length;
-        if (n_bins == 0) return;
+        if (this._image == null) return;
+
+        if (0 < this._dirty) {
+            // the dirty columns end at the newest frame and may wrap around
+            const right = this._frame + 1;
+            const left = right - this._dirty;
+            if (left < 0) {
+                this._upload(left + this._nFrames, this._nFrames);
+                this._upload(0, right);
+            } else {
+                this._upload(left, right);
+            }
+            this._dirty = 0;
+        }
 
         const width = this._canvas.width;
         const height = this._canvas.height;
-        /** 新しいフレームを描画する左端位置 */
-        const left = Math.round(width * this._frame / this._nFrames);
-        /** 新しいフレームを描画する右端位置 */
-        const right = Math.round(width * (this._frame + 1) / this._nFrames);
-
-        // // 新しいフレームを描画する場所をクリア
-        // this._ctx.clearRect(left, 0, right - left, height);
+        const n_bins = this._image.height;
+        /** the oldest frame on the left end */
+        const oldest = (this._frame + 1) % this._nFrames;
+        const split = Math.round(width * (this._nFrames - oldest) / this._nFrames);
 
         this._ctx.save();
         this._ctx.globalAlpha = 1.0;
-
-        for (let index = 0; index < n_bins; ++index) {
-            const top = Math.round(height * index / n_bins);
-            const bottom = Math.round(height * (index + 1) / n_bins);
-
-            /** データ値 */
-            const value = this._data[index];
-
-            // データ値にカラーマップを適用して描画色を決定
-            this._ctx.fillStyle = Color.toRgba(this._colorMap.getColor(value));
-            // データ値を矩形として描画
-            this._ctx.fillRect(left, top, right - left, Math.max(1, bottom - top));
+        this._ctx.imageSmoothingEnabled = false;
+        // scroll by drawing the ring buffer from the offset
+        this._ctx.drawImage(
+            this._buffer as CanvasImageSource,
+            oldest, 0, this._nFrames - oldest, n_bins,
+            0, 0, split, height,
+        );
+        if (0 < oldest) {
+            this._ctx.drawImage(
+                this._buffer as CanvasImageSource,
+                0, 0, oldest, n_bins,
+                split, 0, width - split, height,
+            );
         }
-
         this._ctx.restore();
     }
 };
@@ -0,0 +1,119 @@
+import { io } from 'socket.io-client';
+import { pack_message, unpack_message } from './packet';
+
+
+/** The subset of socket.io `Socket` used by the analyzer. */
+export interface Connection {
+    on(event: string, listener: (...args: any[]) => void): any;
+    emit(event: string, ...args: any[]): any;
+}
+
+/** The delays of the reconnection in milliseconds (the defaults of socket.io). */
+const RECONNECTION_DELAY = 1000;
+const RECONNECTION_DELAY_MAX = 5000;
+const RANDOMIZATION_FACTOR = 0.5;
+
+/**
+ * Connection over the raw WebSocket transport of the server.
+ *
+ * Like socket.io, it reconnects with an exponential backoff when closed
+ * and emits `connect` again (so the listeners restart the analysis).
+ * The messages emitted while disconnected are sent after `connect`.
+ */
+export class RawSocket implements Connection {
+    _url: string
+    _ws: WebSocket
+    _listeners: { [event: string]: ((...args: any[]) => void)[] }
+    _buffer: ArrayBuffer[]
+    _attempts: number
+
+    constructor(url: string) {
+        this._url = url;
+        this._listeners = {};
+        this._buffer = [];
+        this._attempts = 0;
+        this._ws = this._open();
+    }
+
+    _open() {
+        const ws = new WebSocket(this._url);
+        ws.binaryType = 'arraybuffer';
+        ws.addEventListener('open', () => {
+            this._attempts = 0;
+            this._dispatch('connect', []);
+            for (const data of this._buffer.splice(0)) {
+                ws.send(data);
+            }
+        });
+        ws.addEventListener('close', () => {
+            // also closed when the connection failed to open
+            if (this._attempts == 0) {
+                this._dispatch('disconnect', []);
+            }
+            setTimeout(() => { this._ws = this._open(); }, this._delay());
+            ++this._attempts;
+        });
+        ws.addEventListener('message', (event: MessageEvent<ArrayBuffer>) => {
+            const { event: name, args } = unpack_message(event.data);
+            this._dispatch(name, args);
+        });
+        return ws;
+    }
+
+    /** The randomized exponential backoff of the next attempt. */
+    _delay() {
+        const delay = RECONNECTION_DELAY * 2 ** Math.min(this._attempts, 16);
+        const deviation = (Math.random() * 2 - 1) * RANDOMIZATION_FACTOR * delay;
+        return Math.min(delay + deviation, RECONNECTION_DELAY_MAX);
+    }
+
+    _dispatch(event: string, args: any[]) {
+        for (const listener of this._listeners[event] ?? []) {
+            listener(...args);
+        }
+    }
+
+    on(event: string, listener: (...args: any[]) => void) {
+        if (!(event in this._listeners)) {
+            this._listeners[event] = [];
+        }
+        this._listeners[event].push(listener);
+        return this;
+    }
+
+    emit(event: string, ...args: any[]) {
+        const data = pack_message(event, args);
+        if (this._ws.readyState == WebSocket.OPEN) {
+            this._ws.send(data);
+        } else {
+            this._buffer.push(data);
+        }
+        return this;
+    }
+}
+
+/**
+ * Open the raw WebSocket transport when the server advertises it.
+ *
+ * The origin of the page is given explicitly
+ * because the location of a worker is the URL of its script.
+ */
+export async function open_connection(origin: string): Promise<Connection> {
+    let transports: string[] = [];
+    try {
+        const response = await fetch(`${origin}/transports`);
+        if (response.ok) {
+            transports = await response.json();
+        }
+    } catch {
+        // fall back to socket.io
+    }
+
+    if (transports.includes('websocket')) {
+        const url = new URL('/ws', origin);
+        url.protocol = (url.protocol == 'https:') ? 'wss:' : 'ws:';
+        return new RawSocket(url.toString());
+    } else {
+        return io(origin);
+    }
+}
@@ -0,0 +1,60 @@
+/** The binary message format of `_lib/util/packet.py`. */
+const PACKET_VERSION = 1;
+const HEADER_SIZE = 8;
+const ALIGNMENT = 8;
+
+
+function padding(length: number) {
+    return (ALIGNMENT - length % ALIGNMENT) % ALIGNMENT;
+}
+
+export function pack_message(event: string, args: any[]): ArrayBuffer {
+    const attachments: ArrayBuffer[] = [];
+    let offset = 0;
+    const json = JSON.stringify({ event, args }, function (key, value) {
+        if (value instanceof ArrayBuffer) {
+            const placeholder = { '_attachment': [offset, value.byteLength] };
+            attachments.push(value);
+            offset += value.byteLength + padding(value.byteLength);
+            return placeholder;
+        }
+        return value;
+    });
+    const body = new TextEncoder().encode(json);
+
+    const attachments_start = HEADER_SIZE + body.byteLength + padding(HEADER_SIZE + body.byteLength);
+    const buffer = new ArrayBuffer(attachments_start + offset);
+    const view = new DataView(buffer);
+    const bytes = new Uint8Array(buffer);
+    view.setUint8(0, PACKET_VERSION);
+    view.setUint32(4, body.byteLength, false);
+    bytes.set(body, HEADER_SIZE);
+
+    let position = attachments_start;
+    for (const attachment of attachments) {
+        bytes.set(new Uint8Array(attachment), position);
+        position += attachment.byteLength + padding(attachment.byteLength);
+    }
+    return buffer;
+}
+
+export function unpack_message(buffer: ArrayBuffer): { event: string, args: any[] } {
+    const view = new DataView(buffer);
+    const version = view.getUint8(0);
+    if (version != PACKET_VERSION) {
+        throw new Error(`Unknown packet version ${version}.`);
+    }
+
+    const length = view.getUint32(4, false);
+    const body_end = HEADER_SIZE + length;
+    const attachments_start = body_end + padding(body_end);
+    const json = new TextDecoder().decode(new Uint8Array(buffer, HEADER_SIZE, length));
+    return JSON.parse(json, function (key, value) {
+        if (typeof value == "object" && value !== null && '_attachment' in value) {
+            const [offset, size] = value['_attachment'];
+            const start = attachments_start + offset;
+            return buffer.slice(start, start + size);
+        }
+        return value;
+    });
+}
@@ -0,0 +1,223 @@
+/** The portable data format of `_lib/util/convert.py` (and the deltas). */
+export type TypedArray = Int8Array | Uint8Array | Int16Array | Uint16Array | Int32Array | Uint32Array | Float32Array | Float64Array;
+export interface PortableTypedArray {
+    _dtype: string;
+    _buffer: ArrayBuffer;
+};
+export interface PortableTypedArrayDelta {
+    _dtype: string;
+    _same?: boolean;
+    _indices?: ArrayBuffer;
+    _buffer?: ArrayBuffer;
+};
+export type ConvertibleType = null | number | string | TypedArray | ArrayBuffer | ConvertibleType[] | { [key: string]: ConvertibleType };
+export type PortableType = null | number | string | PortableTypedArray | ArrayBuffer | PortableType[] | { [key: string]: PortableType };
+
+
+type TypedArrayConstructor = { new(buffer: ArrayBuffer): TypedArray, BYTES_PER_ELEMENT: number };
+
+/** The typed arrays by the dtypes of `_lib/util/convert.py`. */
+const TYPED_ARRAYS: { [dtype: string]: TypedArrayConstructor } = {
+    "int8": Int8Array,
+    "uint8": Uint8Array,
+    "int16": Int16Array,
+    "uint16": Uint16Array,
+    "int32": Int32Array,
+    "uint32": Uint32Array,
+    "float32": Float32Array,
+    "float64": Float64Array,
+};
+
+/** The buffers are sent in little endian, the byte order of almost all hosts. */
+const LITTLE_ENDIAN = new Uint8Array(new Uint16Array([1]).buffer)[0] == 1;
+
+/** Reverse the bytes of each element in place (only on big endian hosts). */
+function swap_bytes(buffer: ArrayBuffer, size: number) {
+    if (LITTLE_ENDIAN || size == 1) return;
+    const bytes = new Uint8Array(buffer);
+    for (let offset = 0; offset < bytes.length; offset += size) {
+        bytes.subarray(offset, offset + size).reverse();
+    }
+}
+
+/** View the received buffer as a typed array (the buffer is not copied). */
+export function make_typed(dtype: string, buffer: ArrayBuffer) {
+    const constructor = TYPED_ARRAYS[dtype];
+    if (constructor === undefined) {
+        throw new Error(`Unknown dtype '${dtype}'.`);
+    }
+    swap_bytes(buffer, constructor.BYTES_PER_ELEMENT);
+    return new constructor(buffer);
+}
+
+
+export function make_buffer(typed: TypedArray) {
+    for (const dtype in TYPED_ARRAYS) {
+        if (typed instanceof TYPED_ARRAYS[dtype]) {
+            // a copy of the elements only (the array may view a larger buffer)
+            const buffer = typed.slice().buffer as ArrayBuffer;
+            swap_bytes(buffer, typed.BYTES_PER_ELEMENT);
+            return {
+                '_dtype': dtype,
+                '_buffer': buffer,
+            };
+        }
+    }
+    throw new Error('Unknown typed array.');
+}
+
+export function typed_to_bytes(typed: ConvertibleType): PortableType {
+    if (typeof typed == "object") {
+        if (typed === null) {
+            return null;
+        } else if (typed instanceof Int8Array
+            || typed instanceof Uint8Array
+            || typed instanceof Int16Array
+            || typed instanceof Uint16Array
+            || typed instanceof Int32Array
+            || typed instanceof Uint32Array
+            || typed instanceof Float32Array
+            || typed instanceof Float64Array) {
+            return make_buffer(typed);
+        } else if (typed instanceof ArrayBuffer) {
+            return typed;
+        } else if (Array.isArray(typed)) {
+            return typed.map(typed_to_bytes);
+        } else {
+            if ('_dtype' in typed) {
+                throw new Error("Illegal property '_dtype'.");
+            }
+            const data: { [key: string]: PortableType } = {};
+            for (const prop in typed) {
+                data[prop] = typed_to_bytes(typed[prop]);
+            }
+            return data;
+        }
+    } else {
+        return typed;
+    }
+}
+
+export function instanceofPortableTypedArray(data: any): data is PortableTypedArray {
+    return '_dtype' in data;
+}
+
+export function bytes_to_typed(data: PortableType): ConvertibleType {
+    if (typeof data == "object") {
+        if (data === null) {
+            return null;
+        } else if (data instanceof ArrayBuffer) {
+            return data;
+        } else if (Array.isArray(data)) {
+            return data.map(bytes_to_typed);
+        } else if (instanceofPortableTypedArray(data)) {
+            return make_typed(data._dtype, data._buffer);
+        } else {
+            const typed: { [key: string]: ConvertibleType } = {};
+            for (const prop in data) {
+                typed[prop] = bytes_to_typed(data[prop]);
+            }
+            return typed;
+        }
+    } else {
+        return data;
+    }
+}
+
+export function instanceofTypedArray(data: any): data is TypedArray {
+    return ArrayBuffer.isView(data) && !(data instanceof DataView);
+}
+
+export function copy_typed(typed: TypedArray): TypedArray {
+    return new (typed.constructor as { new(source: TypedArray): TypedArray })(typed);
+}
+
+export function deep_copy(data: ConvertibleType): ConvertibleType {
+    if (typeof data == "object") {
+        if (data === null || data instanceof ArrayBuffer) {
+            return data;
+        } else if (instanceofTypedArray(data)) {
+            return copy_typed(data);
+        } else if (Array.isArray(data)) {
+            return data.map(deep_copy);
+        } else {
+            const copied: { [key: string]: ConvertibleType } = {};
+            for (const prop in data) {
+                copied[prop] = deep_copy(data[prop]);
+            }
+            return copied;
+        }
+    } else {
+        return data;
+    }
+}
+
+/**
+ * Reconstruct the results from the delta (see `DeltaEncoder` in Python)
+ * and the results received previously.
+ */
+export function apply_delta(data: PortableType, previous: ConvertibleType | undefined): ConvertibleType {
+    if (typeof data == "object") {
+        if (data === null) {
+            return null;
+        } else if (data instanceof ArrayBuffer) {
+            return data;
+        } else if (Array.isArray(data)) {
+            return data.map((value, index) => apply_delta(
+                value,
+                Array.isArray(previous) ? previous[index] : undefined,
+            ));
+        } else if (instanceofPortableTypedArray(data)) {
+            const delta = data as PortableTypedArrayDelta;
+            if (delta._same || delta._indices !== undefined) {
+                if (!instanceofTypedArray(previous)) {
+                    throw new Error('No previous results to apply the delta.');
+                }
+                const typed = copy_typed(previous);
+                if (delta._indices !== undefined) {
+                    const indices = make_typed("uint32", delta._indices);
+                    const values = make_typed(delta._dtype, delta._buffer!);
+                    for (let index = 0; index < indices.length; ++index) {
+                        typed[indices[index]] = values[index];
+                    }
+                }
+                return typed;
+            }
+            return make_typed(delta._dtype, delta._buffer!);
+        } else {
+            const typed: { [key: string]: ConvertibleType } = {};
+            const previous_dict = (
+                typeof previous == "object" && previous !== null && !Array.isArray(previous)
+                && !(previous instanceof ArrayBuffer) && !instanceofTypedArray(previous)
+            ) ? previous : {};
+            for (const prop in data) {
+                typed[prop] = apply_delta(data[prop], previous_dict[prop]);
+            }
+            return typed;
+        }
+    } else {
+        return data;
+    }
+}
+
+/**
+ * List the buffers of the typed arrays in data to transfer them to another thread.
+ * (The data must own the buffers, e.g. the results of `deep_copy`.)
+ */
+export function list_transferables(data: ConvertibleType): ArrayBuffer[] {
+    const transferables = new Set<ArrayBuffer>();
+    (function collect(data: ConvertibleType) {
+        if (typeof data == "object" && data !== null && !(data instanceof ArrayBuffer)) {
+            if (instanceofTypedArray(data)) {
+                transferables.add(data.buffer as ArrayBuffer);
+            } else if (Array.isArray(data)) {
+                data.forEach(collect);
+            } else {
+                for (const prop in data) {
+                    collect(data[prop]);
+                }
+            }
+        }
+    })(data);
+    return Array.from(transferables);
+}
@@ -1,14 +1,79 @@
 const path = require('path');
+const zlib = require('zlib');
+const { Compilation, sources } = require('webpack');
+
+
+// the compressed assets served by the content negotiation (routes.py)
+const COMPRESSIBLE = /\.(js|css|svg|html)$/i;
+
+
+/**
+ * Emit `manifest.json` mapping the entry names into the content-hashed names
+ * (e.g. `{"bundle.js": "bundle.<hash>.js"}`) and the precompressed variants
+ * (`.gz` and `.br`) of the compressible assets.
+ */
+class StaticAssetPlugin {
+    apply(compiler) {
+        compiler.hooks.thisCompilation.tap('StaticAssetPlugin', (compilation) => {
+            compilation.hooks.processAssets.tap(
+                {
+                    name: 'StaticAssetPlugin',
+                    // after the content hashes are fixed
+                    stage: Compilation.PROCESS_ASSETS_STAGE_OPTIMIZE_TRANSFER,
+                },
+                (assets) => {
+                    const manifest = {};
+                    for (const [name, entrypoint] of compilation.entrypoints) {
+                        for (const file of entrypoint.getFiles()) {
+                            manifest[name + path.extname(file)] = file;
+                        }
+                    }
+                    compilation.emitAsset(
+                        'manifest.json',
+                        new sources.RawSource(JSON.stringify(manifest, null, 4)),
+                    );
+
+                    for (const name of Object.keys(assets)) {
+                        if (!COMPRESSIBLE.test(name)) {
+                            continue;
+                        }
+                        const buffer = assets[name].buffer();
+                        compilation.emitAsset(
+                            name + '.gz',
+                            new sources.RawSource(zlib.gzipSync(buffer, { level: 9 })),
+                        );
+                        compilation.emitAsset(
+                            name + '.br',
+                            new sources.RawSource(zlib.brotliCompressSync(buffer, {
+                                params: {
+                                    [zlib.constants.BROTLI_PARAM_QUALITY]: zlib.constants.BROTLI_MAX_QUALITY,
+                                },
+                            })),
+                        );
+                    }
+                },
+            );
+        });
+    }
+}
 
 
 module.exports = {
     mode: 'production',
     cache: { type: 'memory' },
-    entry: path.resolve(__dirname, 'src/index.ts'),
+    entry: {
+        bundle: path.resolve(__dirname, 'src/index.ts'),
+    },
     output: {
-        filename: 'bundle.js',
+        // cached forever by the browsers (see `asset_url` in the templates)
+        filename: '[name].[contenthash].js',
         path: path.resolve(__dirname, 'dist'),
+        // remove the bundles of the previous builds
+        clean: true,
     },
+    plugins: [
+        new StaticAssetPlugin(),
+    ],
     resolve: {
         extensions: ['.tsx', '.ts', '.mjs', '.js'],
     },